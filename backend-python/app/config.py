@@ -1,7 +1,28 @@
+import math
+import os
+from pathlib import Path
+
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
 
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and cgroup v2 quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # Containers (Railway, Docker --cpus) cap CPU time via cpu.max
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
 class Settings(BaseSettings):
     # App settings
     app_name: str = "SpeakAussie API"
@@ -10,15 +31,95 @@ class Settings(BaseSettings):
     # Server
     host: str = "0.0.0.0"
     port: int = 3001
+    web_concurrency: int = 0  # worker processes for `python -m app.serve`; 0 = one per CPU
+    max_workers: int = 8
+    # SQLite allows one writer at a time; extra workers just queue on the lock
+    sqlite_allow_multiple_workers: bool = False
 
     # Database
     database_url: str = "sqlite+aiosqlite:///./data/aussie-english.db"
+    # Read-only routes use this Postgres replica when set; SQLite reads use mode=ro
+    read_replica_url: str = ""
+    # Skip create_all/migrations on boot when they run at release time
+    skip_schema_creation: bool = False
+
+    # SQLite profile (applied to every new connection)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+
+    # Postgres profile (postgresql+asyncpg://)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
 
     # JWT
     jwt_secret: str = "change-this-in-production"
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 60 * 24 * 7  # 7 days
 
+    # Authenticated principal cache (decoded tokens + User rows)
+    principal_cache_size: int = 10_000
+    principal_cache_ttl_seconds: float = 60.0
+
+    # Password hashing (bcrypt runs on a bounded thread pool)
+    password_hash_workers: int = 4
+
+    # Entitlement cache (plan + today's usage per user)
+    entitlement_cache_size: int = 10_000
+    entitlement_cache_ttl_seconds: float = 5.0
+
+    # Plan catalogue (plan_limits, re-read in the background)
+    plan_catalogue_refresh_seconds: float = 30.0
+
+    # Practice sessions (open-session registry + reaper for abandoned sessions)
+    session_idle_timeout_minutes: int = 60
+    session_unmetered_timeout_minutes: int = 720  # for clients that never heartbeat
+    session_reap_interval_seconds: float = 60.0
+
+    # Live session metering (heartbeats / WebSocket; quota leased per minute)
+    metering_tick_seconds: float = 5.0
+    metering_max_gap_seconds: float = 30.0  # silences longer than this are not billed
+    metering_lease_minutes: int = 1
+
+    # Analytics ingestion (buffered, written in batches)
+    analytics_queue_size: int = 10_000
+    analytics_batch_size: int = 500
+    analytics_flush_interval_seconds: float = 1.0
+    analytics_max_events_per_request: int = 100
+    analytics_rollup_session_retention_hours: int = 48
+
+    # Admin API (X-Admin-API-Key header; admin routes are disabled when empty or a placeholder)
+    admin_api_key: str = ""
+
+    # Admin usage reports (usage_daily, recomputed nightly for recent days)
+    usage_compaction_hour_utc: int = 3
+    usage_compaction_days: int = 2  # 0 disables the nightly compaction
+
+    # Archiving (older rows roll up into monthly_summaries; 0 days disables it)
+    archive_retention_days: int = 400
+    archive_batch_size: int = 500  # rows per transaction
+    archive_batch_pause_seconds: float = 0.05
+    archive_hour_utc: int = 4
+
+    # Streaming exports (rows fetched and encoded per server-side cursor batch)
+    export_batch_rows: int = 1000
+
+    # Observability
+    metrics_enabled: bool = True  # /metrics, behind the admin API key
+    debug_query_header: bool = False  # X-DB-Queries / X-DB-Time-Ms on every response
+
+    # Event-loop watchdog and /health/deep
+    loop_watchdog_interval_seconds: float = 0.1  # 0 disables the watchdog
+    loop_lag_warn_seconds: float = 0.25  # log the blocking stack past this
+    loop_lag_unhealthy_seconds: float = 0.5  # /health/deep fails when p99 lag exceeds this
+    health_db_timeout_seconds: float = 2.0
+
     # CORS
     frontend_url: str = "http://localhost:5173"
     allowed_origins: list[str] = [
@@ -34,6 +135,20 @@ class Settings(BaseSettings):
     stripe_price_basic: str = ""
     stripe_price_standard: str = ""
     stripe_price_premium: str = ""
+    # Webhook events are stored and acknowledged, then applied by a worker
+    stripe_webhook_tolerance_seconds: int = 300  # max age of a signature timestamp
+    stripe_webhook_batch_size: int = 100
+    stripe_webhook_poll_seconds: float = 5.0  # picks up events received by other workers
+    stripe_webhook_max_attempts: int = 5
+    stripe_webhook_retry_seconds: float = 5.0  # first retry delay, doubled per attempt
+    stripe_webhook_retry_max_seconds: float = 3600.0
+
+    def worker_count(self) -> int:
+        """Worker processes to serve with, derived from CPUs unless set."""
+        workers = self.web_concurrency or min(available_cpus(), self.max_workers)
+        if self.database_url.startswith("sqlite") and not self.sqlite_allow_multiple_workers:
+            return 1
+        return max(1, workers)
 
     class Config:
         env_file = ".env"
@@ -1,30 +1,230 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from pathlib import Path
 
 from app.config import settings
+from app.metrics import Histogram
 
-# Ensure data directory exists
-Path("./data").mkdir(parents=True, exist_ok=True)
 
-# Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
+def normalize_database_url(database_url: str) -> URL:
+    """Map plain Postgres URLs (as handed out by Railway) onto asyncpg."""
+    url = make_url(database_url)
+    if url.drivername in ("postgres", "postgresql"):
+        url = url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Apply the SQLite profile to every new connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def _set_sqlite_read_pragmas(dbapi_connection, connection_record) -> None:
+    """Read-only connections: the primary owns journal mode and sync settings."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def sqlite_read_only_url(url: URL) -> URL:
+    """The same SQLite file opened as a read-only URI (``mode=ro``)."""
+    path = Path(url.database).resolve()
+    return url.set(database=f"file:{path}", query={"mode": "ro", "uri": "true"})
+
+
+def _sqlite_options(url: URL) -> dict:
+    """SQLite: the driver's default pool; tuning happens in the pragmas."""
+    return {}
+
+
+def _postgres_options(url: URL) -> dict:
+    """Postgres/asyncpg: pooled connections, sized from Settings."""
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        # Set to 0 behind PgBouncer in transaction pooling mode
+        "connect_args": {"statement_cache_size": settings.db_statement_cache_size},
+    }
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    name: str
+    engine_options: Callable[[URL], dict]
+    on_connect: Optional[Callable] = None
+
+
+STORAGE_PROFILES = {
+    "sqlite": StorageProfile("sqlite", _sqlite_options, _set_sqlite_pragmas),
+    "postgresql": StorageProfile("postgresql", _postgres_options),
+}
+
+
+def create_engine_for(database_url: str) -> AsyncEngine:
+    """Create an async engine using the storage profile for the URL's backend."""
+    url = normalize_database_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in STORAGE_PROFILES:
+        raise ValueError(f"Unsupported database backend: {backend}")
+
+    profile = STORAGE_PROFILES[backend]
+    engine = create_async_engine(
+        url,
+        echo=settings.debug,
+        **profile.engine_options(url),
+    )
+    if profile.on_connect is not None:
+        event.listen(engine.sync_engine, "connect", profile.on_connect)
+    return engine
+
+
+@dataclass
+class QueryStats:
+    """Number of queries and time spent in them."""
+
+    count: int = 0
+    seconds: float = 0.0
+
+
+# Set per request by the metrics middleware; background work leaves it unset
+request_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "request_query_stats", default=None
 )
+# Process-wide totals across requests and background tasks
+query_totals = QueryStats()
+query_latency = Histogram(buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    query_totals.count += 1
+    query_totals.seconds += elapsed
+    query_latency.observe(elapsed)
+
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+def _on_error(exception_context) -> None:
+    # after_cursor_execute does not fire for failed statements
+    if exception_context.connection is not None:
+        started = exception_context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
 
-# Session factory
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Count queries and time spent in them, per request and overall."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _on_error)
+
+
+# Create async engine
+engine = create_engine_for(settings.database_url)
+instrument_engine(engine)
+
+
+def create_read_engine() -> AsyncEngine:
+    """
+    Engine for read-only sessions.
+
+    A replica when READ_REPLICA_URL is set, otherwise a ``mode=ro`` handle
+    on a file-backed SQLite database, otherwise the primary. Connections
+    run in autocommit, so reads never open (or commit) a transaction.
+    """
+    if settings.read_replica_url:
+        read_engine = create_engine_for(settings.read_replica_url)
+    elif engine.url.get_backend_name() == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        read_engine = create_async_engine(sqlite_read_only_url(engine.url), echo=settings.debug)
+        event.listen(read_engine.sync_engine, "connect", _set_sqlite_read_pragmas)
+    else:
+        return engine.execution_options(isolation_level="AUTOCOMMIT")
+
+    instrument_engine(read_engine)
+    return read_engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+read_engine = create_read_engine()
+
+
+async def dispose_engines() -> None:
+    """Close pooled connections on the primary and read engines."""
+    await engine.dispose()
+    if read_engine.sync_engine.pool is not engine.sync_engine.pool:
+        await read_engine.dispose()
+
+
+def _dispose_after_fork() -> None:
+    engine.sync_engine.dispose(close=False)
+    read_engine.sync_engine.dispose(close=False)
+
+
+# A forked worker (gunicorn --preload, multiprocessing) must not reuse the
+# parent's pooled connections; it opens its own on first use.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+# Session factories
 async_session = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+read_session = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    # A replica may lag the primary; see is_replica()
+    info={"replica": bool(settings.read_replica_url)},
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
+def dialect_insert(session: AsyncSession):
+    """insert() for the session's dialect, which supports ON CONFLICT."""
+    if session.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
 async def get_db():
     """Dependency for getting database sessions."""
     async with async_session() as session:
@@ -36,7 +236,46 @@ async def get_db():
             raise
 
 
-async def init_db():
-    """Initialize database tables."""
+async def get_read_db():
+    """Dependency for read-only routes: never commits, cannot write."""
+    async with read_session() as session:
+        yield session
+
+
+def is_replica(session: AsyncSession) -> bool:
+    """True when the session reads from a (possibly lagging) replica."""
+    return session.info.get("replica", False)
+
+
+def ensure_database_directory(url: URL) -> None:
+    """Create the directory holding a file-backed SQLite database."""
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        Path(url.database).parent.mkdir(parents=True, exist_ok=True)
+
+
+async def init_db(force: bool = False):
+    """
+    Initialize database tables and apply pending migrations.
+
+    With ``skip_schema_creation`` set (migrations applied at release time,
+    via ``python -m app.migrations upgrade``) boot only checks that the
+    schema is current instead of reflecting and creating every table.
+    ``force`` runs the full upgrade regardless.
+    """
+    from app import models  # noqa: F401  (registers tables on Base.metadata)
+    from app.migrations import pending_migrations, run_migrations
+
+    ensure_database_directory(engine.url)
+
     async with engine.begin() as conn:
+        if settings.skip_schema_creation and not force:
+            pending = await pending_migrations(conn)
+            if pending:
+                raise RuntimeError(
+                    f"Database schema is behind (pending migrations {pending}); "
+                    "run `python -m app.migrations upgrade` or unset SKIP_SCHEMA_CREATION"
+                )
+            return
+
         await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
@@ -7,13 +7,25 @@ Voice AI handled directly via ElevenLabs.
 
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from loguru import logger
 
 from app.config import settings
-from app.database import init_db
+from app.database import dispose_engines, init_db
+from app.middleware import MetricsMiddleware
 from app.routes import api_router
+from app.services.analytics import event_buffer
+from app.services.archive import archive_job
+from app.services.auth import require_admin
+from app.services.billing import stripe_event_worker
+from app.services.hashing import password_hasher
+from app.services.plans import plan_catalogue
+from app.services.reporting import usage_compactor
+from app.services.sessions import active_sessions, session_reaper
+from app.services.watchdog import loop_watchdog
+from app.telemetry import deep_health, render_metrics
 
 
 @asynccontextmanager
@@ -21,13 +33,30 @@ async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
     logger.info("Starting SpeakAussie API...")
+    loop_watchdog.start()
     await init_db()
     logger.info("Database initialized")
+    await plan_catalogue.start()
+    await active_sessions.load()
+    session_reaper.start()
+    usage_compactor.start()
+    archive_job.start()
+    stripe_event_worker.start()
+    event_buffer.start()
 
     yield
 
     # Shutdown
     logger.info("Shutting down SpeakAussie API...")
+    await event_buffer.stop()
+    await stripe_event_worker.stop()
+    await archive_job.stop()
+    await usage_compactor.stop()
+    await session_reaper.stop()
+    await plan_catalogue.stop()
+    password_hasher.shutdown()
+    await dispose_engines()
+    await loop_watchdog.stop()
 
 
 app = FastAPI(
@@ -46,6 +75,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics middleware (outermost, so it times everything above)
+app.add_middleware(MetricsMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
@@ -60,6 +92,25 @@ async def health_check():
     }
 
 
+@app.get("/health/deep")
+async def deep_health_check():
+    """Readiness check for load balancers: loop lag, database and pool."""
+    healthy, report = await deep_health()
+    return JSONResponse(
+        report,
+        status_code=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def metrics():
+    """Prometheus metrics endpoint; scrape with the X-Admin-API-Key header."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
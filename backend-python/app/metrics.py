@@ -0,0 +1,164 @@
+from bisect import bisect_left
+from collections import Counter
+from typing import Optional
+
+# Seconds; tuned for request handlers and bcrypt rounds alike
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, Prometheus-style."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(upper bound, cumulative count) pairs including +Inf."""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            running += count
+            pairs.append(("+Inf" if bound == float("inf") else repr(bound), running))
+        return pairs
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+# Queries per request; a route creeping up these buckets is an N+1 suspect
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 50)
+
+
+def _format_labels(labels: Optional[dict]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class PrometheusWriter:
+    """Accumulates samples in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lines: list[str] = []
+        self._declared: set[str] = set()
+
+    def declare(self, name: str, kind: str, help_text: str) -> None:
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[dict] = None) -> None:
+        self._lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    def gauge(self, name: str, value: float, help_text: str, labels: Optional[dict] = None) -> None:
+        self.declare(name, "gauge", help_text)
+        self.sample(name, value, labels)
+
+    def counter(self, name: str, value: float, help_text: str, labels: Optional[dict] = None) -> None:
+        self.declare(name, "counter", help_text)
+        self.sample(name, value, labels)
+
+    def histogram(
+        self, name: str, histogram: Histogram, help_text: str, labels: Optional[dict] = None
+    ) -> None:
+        self.declare(name, "histogram", help_text)
+        labels = labels or {}
+        for bound, count in histogram.cumulative():
+            self.sample(f"{name}_bucket", count, {**labels, "le": bound})
+        self.sample(f"{name}_sum", round(histogram.sum, 6), labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+class RequestMetrics:
+    """Latency, status and database usage per (method, route template)."""
+
+    def __init__(self):
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.queries: dict[tuple[str, str], Histogram] = {}
+        self.db_seconds: Counter = Counter()
+        self.statuses: Counter = Counter()
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        queries: int,
+        db_seconds: float,
+    ) -> None:
+        key = (method, route)
+        if key not in self.latency:
+            self.latency[key] = Histogram()
+            self.queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+        self.latency[key].observe(seconds)
+        self.queries[key].observe(queries)
+        self.db_seconds[key] += db_seconds
+        self.statuses[(method, route, status)] += 1
+
+    def write(self, out: PrometheusWriter) -> None:
+        for (method, route), histogram in sorted(self.latency.items()):
+            out.histogram(
+                "http_request_duration_seconds",
+                histogram,
+                "Request latency by route",
+                {"method": method, "route": route},
+            )
+        for (method, route, status), count in sorted(self.statuses.items()):
+            out.counter(
+                "http_requests_total",
+                count,
+                "Requests by route and status",
+                {"method": method, "route": route, "status": status},
+            )
+        for (method, route), histogram in sorted(self.queries.items()):
+            out.histogram(
+                "http_request_db_queries",
+                histogram,
+                "Database queries issued per request",
+                {"method": method, "route": route},
+            )
+        for (method, route), seconds in sorted(self.db_seconds.items()):
+            out.counter(
+                "http_request_db_seconds_total",
+                round(seconds, 6),
+                "Time spent in database queries by route",
+                {"method": method, "route": route},
+            )
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,74 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.database import QueryStats, request_query_stats
+from app.metrics import request_metrics
+
+
+def route_label(scope: Scope) -> str:
+    """Full route template for a handled request, e.g. ``/api/sessions/{session_id}/end``."""
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return "unmatched"
+
+    # Routes from included routers may only know their path relative to the
+    # router prefix; recover the prefix from the concrete request path.
+    try:
+        rendered = template.format(**{k: str(v) for k, v in scope.get("path_params", {}).items()})
+    except (KeyError, IndexError, ValueError):
+        return template
+    path = scope["path"]
+    if rendered and path.endswith(rendered):
+        return path[: len(path) - len(rendered)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and database usage for every HTTP request.
+
+    Requests are labelled by route template (``/api/sessions/{session_id}/end``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    With ``debug_query_header`` enabled, responses carry the number of
+    queries and DB time spent up to the moment headers were sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = request_query_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.debug_query_header:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.count)
+                    headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            request_query_stats.reset(token)
+            request_metrics.observe(
+                method=scope["method"],
+                route=route_label(scope),
+                status=status_code,
+                seconds=time.perf_counter() - started,
+                queries=stats.count,
+                db_seconds=stats.seconds,
+            )
@@ -0,0 +1,326 @@
+"""
+Versioned schema migrations.
+
+``Base.metadata.create_all`` only creates missing tables, so anything added
+to an existing table (indexes, constraints) ships as a numbered migration
+here. Pending migrations run from ``init_db`` at startup, or by hand:
+
+    python -m app.migrations upgrade   # apply pending migrations
+    python -m app.migrations status    # list applied / pending versions
+    python -m app.migrations check     # EXPLAIN hot queries, fail on table scans
+
+Statements must be idempotent (``IF NOT EXISTS``) because fresh databases
+already get every index from the models via ``create_all``. New columns
+are listed in ``columns`` and only added when missing, for the same reason.
+"""
+
+import asyncio
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from loguru import logger
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: tuple[str, ...] = ()
+    columns: tuple[tuple[str, str, str], ...] = ()  # (table, column, DDL type)
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        version=1,
+        description="usage_records: merge duplicate days, unique (user_id, date)",
+        statements=(
+            """
+            UPDATE usage_records SET
+                minutes_used = (
+                    SELECT SUM(u.minutes_used) FROM usage_records u
+                    WHERE u.user_id = usage_records.user_id AND u.date = usage_records.date
+                ),
+                sessions_count = (
+                    SELECT SUM(u.sessions_count) FROM usage_records u
+                    WHERE u.user_id = usage_records.user_id AND u.date = usage_records.date
+                )
+            WHERE id IN (
+                SELECT MIN(id) FROM usage_records
+                GROUP BY user_id, date HAVING COUNT(*) > 1
+            )
+            """,
+            """
+            DELETE FROM usage_records WHERE id NOT IN (
+                SELECT MIN(id) FROM usage_records GROUP BY user_id, date
+            )
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_usage_records_user_date "
+            "ON usage_records (user_id, date)",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="practice_sessions: (user_id, started_at DESC) for history",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_practice_sessions_user_started "
+            "ON practice_sessions (user_id, started_at DESC)",
+        ),
+    ),
+    Migration(
+        version=3,
+        description="practice_sessions: partial index on open sessions",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_practice_sessions_user_active "
+            "ON practice_sessions (user_id, started_at DESC) WHERE ended_at IS NULL",
+        ),
+    ),
+    Migration(
+        version=4,
+        description="practice_sessions: add id to history index for keyset pagination",
+        statements=(
+            "DROP INDEX IF EXISTS ix_practice_sessions_user_started",
+            "CREATE INDEX ix_practice_sessions_user_started "
+            "ON practice_sessions (user_id, started_at DESC, id DESC)",
+        ),
+    ),
+    Migration(
+        version=5,
+        description="practice_sessions: last_active_at for the idle-session reaper",
+        columns=(("practice_sessions", "last_active_at", "TIMESTAMP"),),
+    ),
+    Migration(
+        version=6,
+        description="practice_sessions: metered_minutes already billed by heartbeats",
+        columns=(("practice_sessions", "metered_minutes", "INTEGER NOT NULL DEFAULT 0"),),
+    ),
+    Migration(
+        version=7,
+        description="user_stats: total_minutes, indexed for the top-users report",
+        columns=(("user_stats", "total_minutes", "INTEGER NOT NULL DEFAULT 0"),),
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_user_stats_total_minutes "
+            "ON user_stats (total_minutes)",
+        ),
+    ),
+    Migration(
+        version=8,
+        description="practice_sessions, usage_records: age indexes for the archiving job",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_practice_sessions_started_at "
+            "ON practice_sessions (started_at)",
+            "CREATE INDEX IF NOT EXISTS ix_usage_records_date ON usage_records (date)",
+        ),
+    ),
+    Migration(
+        version=9,
+        description="subscriptions: Stripe id lookups and last applied webhook event",
+        columns=(("subscriptions", "stripe_event_at", "TIMESTAMP"),),
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_subscriptions_stripe_subscription_id "
+            "ON subscriptions (stripe_subscription_id)",
+            "CREATE INDEX IF NOT EXISTS ix_subscriptions_stripe_customer_id "
+            "ON subscriptions (stripe_customer_id)",
+        ),
+    ),
+    Migration(
+        version=10,
+        description="practice_sessions: metered_minutes holds every minute billed",
+        # Ended sessions were billed max(metered, session minutes)
+        statements=(
+            "UPDATE practice_sessions SET metered_minutes = COALESCE(duration_seconds, 0) / 60 "
+            "WHERE ended_at IS NOT NULL AND COALESCE(duration_seconds, 0) / 60 > metered_minutes",
+            "UPDATE practice_sessions SET metered_minutes = 1 "
+            "WHERE ended_at IS NOT NULL AND metered_minutes < 1",
+        ),
+    ),
+    Migration(
+        version=11,
+        description="practice_sessions: reaped_at, so a late client end can correct it",
+        columns=(("practice_sessions", "reaped_at", "TIMESTAMP"),),
+    ),
+    Migration(
+        version=12,
+        description="stripe_events: next_attempt_at, retry failed events with backoff",
+        columns=(("stripe_events", "next_attempt_at", "TIMESTAMP"),),
+    ),
+    Migration(
+        version=13,
+        description="analytics_events: occurred_at, to recount late rollup buckets",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_analytics_events_occurred_at "
+            "ON analytics_events (occurred_at)",
+        ),
+    ),
+]
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def _applied_versions(conn: Connection) -> set[int]:
+    _ensure_version_table(conn)
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def _upgrade(conn: Connection) -> list[int]:
+    applied = _applied_versions(conn)
+    newly_applied = []
+
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        for table, column, ddl_type in migration.columns:
+            existing = {c["name"] for c in inspect(conn).get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+        for statement in migration.statements:
+            conn.execute(text(statement))
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+            {"v": migration.version, "d": migration.description},
+        )
+        newly_applied.append(migration.version)
+
+    return newly_applied
+
+
+async def run_migrations(conn: AsyncConnection) -> list[int]:
+    """Apply pending migrations inside the caller's transaction."""
+    return await conn.run_sync(_upgrade)
+
+
+async def pending_migrations(conn: AsyncConnection) -> list[int]:
+    """Versions not yet recorded in schema_migrations."""
+    applied = await conn.run_sync(_applied_versions)
+    return sorted(m.version for m in MIGRATIONS if m.version not in applied)
+
+
+# Queries on the request hot path, as issued by the routes and services.
+HOT_QUERIES: dict[str, str] = {
+    "entitlement": (
+        "SELECT subscriptions.plan, usage_records.minutes_used FROM users "
+        "LEFT OUTER JOIN subscriptions ON subscriptions.user_id = users.id "
+        "LEFT OUTER JOIN usage_records ON usage_records.user_id = users.id "
+        "AND usage_records.date = :day WHERE users.id = :user_id"
+    ),
+    "usage_upsert_target": (
+        "SELECT minutes_used FROM usage_records "
+        "WHERE user_id = :user_id AND date = :day"
+    ),
+    "usage_history": (
+        "SELECT date, minutes_used, sessions_count FROM usage_records "
+        "WHERE user_id = :user_id AND date >= :day "
+        "ORDER BY date DESC, id DESC LIMIT 32"
+    ),
+    "active_session": (
+        "SELECT id FROM practice_sessions "
+        "WHERE user_id = :user_id AND ended_at IS NULL "
+        "ORDER BY started_at DESC LIMIT 1"
+    ),
+    "session_history": (
+        "SELECT id, started_at FROM practice_sessions "
+        "WHERE user_id = :user_id AND (started_at, id) < (:started_at, :id) "
+        "ORDER BY started_at DESC, id DESC LIMIT 11"
+    ),
+    "archive_sessions_batch": (
+        "SELECT id FROM practice_sessions "
+        "WHERE started_at < :started_at AND ended_at IS NOT NULL LIMIT 500"
+    ),
+    "stripe_event_queue": (
+        "SELECT id FROM stripe_events WHERE processed_at IS NULL "
+        "AND (next_attempt_at IS NULL OR next_attempt_at <= :started_at) "
+        "ORDER BY created, id LIMIT 100"
+    ),
+    "stripe_subscription_lookup": (
+        "SELECT id FROM subscriptions WHERE stripe_subscription_id = :user_id"
+    ),
+    "archive_usage_batch": (
+        "SELECT id FROM usage_records WHERE date < :day LIMIT 500"
+    ),
+}
+
+
+def _explain(conn: Connection) -> dict[str, tuple[bool, list[str]]]:
+    params = {
+        "user_id": "explain-check",
+        "day": date.today(),
+        "started_at": datetime.utcnow(),
+        "id": "",
+    }
+    dialect = conn.dialect.name
+    report = {}
+
+    if dialect == "postgresql":
+        # Tiny tables make seq scans cheapest; ask whether an index *can* serve
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+    for name, sql in HOT_QUERIES.items():
+        if dialect == "sqlite":
+            rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+            plan = [row[-1] for row in rows]
+            uses_index = all(
+                "INDEX" in line or not line.startswith("SCAN ")
+                for line in plan
+            )
+        else:
+            plan = list(conn.execute(text(f"EXPLAIN {sql}"), params).scalars())
+            uses_index = not any("Seq Scan" in line for line in plan)
+        report[name] = (uses_index, plan)
+
+    return report
+
+
+async def explain_hot_queries(engine: AsyncEngine) -> dict[str, tuple[bool, list[str]]]:
+    """EXPLAIN each hot query; maps name -> (uses an index, plan lines)."""
+    async with engine.begin() as conn:
+        report = await conn.run_sync(_explain)
+        await conn.rollback()
+    return report
+
+
+async def _main(command: str) -> int:
+    from app.database import engine, init_db
+
+    try:
+        if command == "upgrade":
+            await init_db(force=True)
+            return 0
+
+        if command == "status":
+            async with engine.begin() as conn:
+                applied = await conn.run_sync(_applied_versions)
+            for migration in MIGRATIONS:
+                state = "applied" if migration.version in applied else "pending"
+                print(f"{migration.version:>4}  {state:<8} {migration.description}")
+            return 0
+
+        if command == "check":
+            await init_db(force=True)
+            failures = 0
+            for name, (uses_index, plan) in (await explain_hot_queries(engine)).items():
+                print(f"{'ok  ' if uses_index else 'SCAN'} {name}")
+                for line in plan:
+                    print(f"       {line}")
+                failures += not uses_index
+            return 1 if failures else 0
+    finally:
+        await engine.dispose()
+
+    print(f"Unknown command: {command}. Use upgrade, status or check.")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "upgrade")))
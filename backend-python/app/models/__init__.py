@@ -1,6 +1,26 @@
 from app.models.user import User
 from app.models.subscription import Subscription, PlanLimit
 from app.models.usage import UsageRecord
-from app.models.session import PracticeSession
+from app.models.session import PracticeSession, PRACTICE_MODES
+from app.models.stats import UserStats
+from app.models.reporting import UsageDaily, ALL_MODES
+from app.models.archive import MonthlySummary
+from app.models.billing import StripeEvent
+from app.models.analytics import EventRecord, EventRollup, EventRollupSession
 
-__all__ = ["User", "Subscription", "PlanLimit", "UsageRecord", "PracticeSession"]
+__all__ = [
+    "User",
+    "Subscription",
+    "PlanLimit",
+    "UsageRecord",
+    "PracticeSession",
+    "PRACTICE_MODES",
+    "UserStats",
+    "UsageDaily",
+    "ALL_MODES",
+    "MonthlySummary",
+    "StripeEvent",
+    "EventRecord",
+    "EventRollup",
+    "EventRollupSession",
+]
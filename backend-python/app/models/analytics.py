@@ -0,0 +1,41 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index, JSON, func
+
+from app.database import Base
+
+
+class EventRecord(Base):
+    __tablename__ = "analytics_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String, nullable=False)  # frontend analytics session, not a PracticeSession
+    name = Column(String, nullable=False)
+    properties = Column(JSON, nullable=True)
+    occurred_at = Column(DateTime, nullable=False)  # client timestamp (UTC)
+    received_at = Column(DateTime, server_default=func.now())
+
+
+# Late events recount a rollup bucket's distinct sessions from the raw rows
+Index("ix_analytics_events_occurred_at", EventRecord.occurred_at)
+
+
+class EventRollup(Base):
+    """Event counts per name per hour/day bucket, maintained on ingest."""
+
+    __tablename__ = "analytics_rollups"
+
+    granularity = Column(String, primary_key=True)  # hour, day
+    name = Column(String, primary_key=True)  # "*" = all events
+    bucket_start = Column(DateTime, primary_key=True)
+    event_count = Column(Integer, nullable=False, default=0)
+    session_count = Column(Integer, nullable=False, default=0)  # distinct sessionId
+
+
+class EventRollupSession(Base):
+    """Sessions already counted in a rollup bucket; pruned once buckets close."""
+
+    __tablename__ = "analytics_rollup_sessions"
+
+    granularity = Column(String, primary_key=True)
+    name = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    session_id = Column(String, primary_key=True)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, func
+
+from app.database import Base
+
+
+class MonthlySummary(Base):
+    """
+    Per-user monthly totals of archived rows, the cold tier of history.
+
+    The archiving job (app.services.archive) folds practice_sessions into
+    one row per (user, month, mode) and usage_records into the month's
+    ``ALL_MODES`` row, then deletes the originals. History endpoints read
+    these rows once a user's hot rows run out.
+    """
+
+    __tablename__ = "monthly_summaries"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    mode = Column(String, primary_key=True)  # practice mode, or ALL_MODES for usage_records
+    sessions = Column(Integer, nullable=False, default=0)
+    minutes = Column(Integer, nullable=False, default=0)
+    duration_seconds = Column(Integer, nullable=False, default=0)
+    messages_count = Column(Integer, nullable=False, default=0)
+    feedback_positive = Column(Integer, nullable=False, default=0)
+    feedback_total = Column(Integer, nullable=False, default=0)
+    active_days = Column(Integer, nullable=False, default=0)  # ALL_MODES rows only
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
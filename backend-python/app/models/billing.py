@@ -0,0 +1,35 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, Index, func
+
+from app.database import Base
+
+
+class StripeEvent(Base):
+    """
+    Stripe webhook events, keyed by Stripe's event id.
+
+    The webhook route inserts each event once (redeliveries hit the primary
+    key and are dropped) and acknowledges; app.services.billing applies
+    pending events in ``created`` order and sets ``processed_at``.
+    """
+
+    __tablename__ = "stripe_events"
+
+    id = Column(String, primary_key=True)  # evt_...
+    type = Column(String, nullable=False)
+    created = Column(DateTime, nullable=False)  # Stripe's event timestamp (UTC)
+    payload = Column(Text, nullable=False)  # the raw, verified event body
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)  # last failure, kept once attempts run out
+    next_attempt_at = Column(DateTime, nullable=True)  # failed events wait until then
+    received_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)
+
+
+# The worker's queue: unprocessed events, oldest first
+Index(
+    "ix_stripe_events_pending",
+    StripeEvent.created,
+    StripeEvent.id,
+    sqlite_where=StripeEvent.processed_at.is_(None),
+    postgresql_where=StripeEvent.processed_at.is_(None),
+)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, Date, DateTime, func
+
+from app.database import Base
+
+# Mode value for a plan's all-modes row, which also carries active_users
+ALL_MODES = "*"
+
+
+class UsageDaily(Base):
+    """
+    Daily usage aggregate for admin reports, one row per (date, plan, mode).
+
+    Incremented as sessions are billed and recomputed for recent days by
+    the nightly compaction, so reports read a few hundred rows at most.
+    ``active_users`` is only kept on the ``ALL_MODES`` row of each plan.
+    """
+
+    __tablename__ = "usage_daily"
+
+    date = Column(Date, primary_key=True)
+    plan = Column(String, primary_key=True)
+    mode = Column(String, primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0)
+    minutes = Column(Integer, nullable=False, default=0)
+    active_users = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
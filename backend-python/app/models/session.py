@@ -1,9 +1,11 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 
 from app.database import Base
 
+PRACTICE_MODES = ("everyday", "slang", "workplace")
+
 
 class PracticeSession(Base):
     __tablename__ = "practice_sessions"
@@ -13,6 +15,9 @@ class PracticeSession(Base):
     mode = Column(String, nullable=False, default="everyday")  # everyday, slang, workplace
     started_at = Column(DateTime, server_default=func.now())
     ended_at = Column(DateTime, nullable=True)
+    last_active_at = Column(DateTime, nullable=True)  # last client activity, for the reaper
+    reaped_at = Column(DateTime, nullable=True)  # closed by the reaper, until the client's end corrects it
+    metered_minutes = Column(Integer, nullable=False, default=0, server_default="0")  # billed to usage so far
     duration_seconds = Column(Integer, nullable=True)
     messages_count = Column(Integer, nullable=False, default=0)
     feedback = Column(Boolean, nullable=True)  # True = good, False = needs work
@@ -20,3 +25,22 @@ class PracticeSession(Base):
 
     # Relationships
     user = relationship("User", back_populates="practice_sessions")
+
+
+# Hot paths: /sessions/history orders a user's sessions by started_at, and
+# /sessions/active looks for the newest one that has not ended yet.
+Index(
+    "ix_practice_sessions_user_started",
+    PracticeSession.user_id,
+    PracticeSession.started_at.desc(),
+    PracticeSession.id.desc(),  # keyset tie-breaker for /sessions/history
+)
+Index(
+    "ix_practice_sessions_user_active",
+    PracticeSession.user_id,
+    PracticeSession.started_at.desc(),
+    sqlite_where=PracticeSession.ended_at.is_(None),
+    postgresql_where=PracticeSession.ended_at.is_(None),
+)
+# The archiving job takes the oldest ended sessions in small batches
+Index("ix_practice_sessions_started_at", PracticeSession.started_at)
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, Index, func
+
+from app.database import Base
+
+
+class UserStats(Base):
+    """
+    Per-user progress counters, maintained incrementally as sessions end.
+
+    One row per user; see app.services.stats for the update and the
+    backfill that rebuilds it from practice_sessions.
+    """
+
+    __tablename__ = "user_stats"
+    __table_args__ = (
+        # Admin top-users report reads the first N entries of this index
+        Index("ix_user_stats_total_minutes", "total_minutes"),
+    )
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+
+    # Per mode (see PRACTICE_MODES)
+    everyday_sessions = Column(Integer, nullable=False, default=0)
+    everyday_seconds = Column(Integer, nullable=False, default=0)
+    slang_sessions = Column(Integer, nullable=False, default=0)
+    slang_seconds = Column(Integer, nullable=False, default=0)
+    workplace_sessions = Column(Integer, nullable=False, default=0)
+    workplace_seconds = Column(Integer, nullable=False, default=0)
+
+    # Billed minutes across all sessions (practice_sessions.metered_minutes)
+    total_minutes = Column(Integer, nullable=False, default=0, server_default="0")
+
+    feedback_positive = Column(Integer, nullable=False, default=0)
+    feedback_total = Column(Integer, nullable=False, default=0)
+
+    # Consecutive practice days; current_streak is as of last_practice_date
+    current_streak = Column(Integer, nullable=False, default=0)
+    longest_streak = Column(Integer, nullable=False, default=0)
+    last_practice_date = Column(Date, nullable=True)
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
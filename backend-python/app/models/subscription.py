@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, func
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 
@@ -7,6 +7,11 @@ from app.database import Base
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Stripe webhook events find their subscription by these ids
+        Index("ix_subscriptions_stripe_subscription_id", "stripe_subscription_id"),
+        Index("ix_subscriptions_stripe_customer_id", "stripe_customer_id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=False, unique=True)
@@ -16,6 +21,7 @@ class Subscription(Base):
     status = Column(String, nullable=False, default="active")  # active, cancelled, past_due
     current_period_start = Column(DateTime, nullable=True)
     current_period_end = Column(DateTime, nullable=True)
+    stripe_event_at = Column(DateTime, nullable=True)  # creation time of the last applied Stripe event
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
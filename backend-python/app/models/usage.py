@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, func
+from sqlalchemy import Column, String, Integer, Date, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 
@@ -7,6 +7,12 @@ from app.database import Base
 
 class UsageRecord(Base):
     __tablename__ = "usage_records"
+    __table_args__ = (
+        # One row per user per day; usage is recorded with ON CONFLICT upserts
+        Index("uq_usage_records_user_date", "user_id", "date", unique=True),
+        # The archiving job takes the oldest days in small batches
+        Index("ix_usage_records_date", "date"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.routes import auth, subscriptions, sessions, analytics
+from app.routes import auth, subscriptions, sessions, analytics, bootstrap, admin, billing
 
 api_router = APIRouter()
 
@@ -8,3 +8,6 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(subscriptions.router, prefix="/subscriptions", tags=["subscriptions"])
 api_router.include_router(sessions.router, prefix="/sessions", tags=["sessions"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(bootstrap.router, tags=["bootstrap"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
+api_router.include_router(billing.router, prefix="/billing", tags=["billing"])
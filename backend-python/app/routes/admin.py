@@ -0,0 +1,99 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_read_db
+from app.services.auth import require_admin
+from app.services.export import ExportFormat, ExportTable, export_query, export_response
+from app.services.pagination import clamp_page_size
+from app.services.reporting import top_users, usage_daily, usage_summary
+from app.services.usage import billing_day
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+MAX_REPORT_DAYS = 90
+
+
+class UsageBreakdown(BaseModel):
+    sessions: int
+    minutes: int
+
+
+class UsageTotals(BaseModel):
+    """Minutes are billed minutes, the same ones counted against daily quotas."""
+
+    active_users: int
+    total_sessions: int
+    total_minutes: int
+    by_plan: dict[str, UsageBreakdown]
+    by_mode: dict[str, UsageBreakdown]
+
+
+class DayUsage(UsageTotals):
+    date: date
+
+
+class MonthUsage(UsageTotals):
+    start_date: date
+
+
+class UsageSummaryResponse(BaseModel):
+    total_users: int
+    subscriptions: dict[str, int]
+    today: DayUsage
+    this_month: MonthUsage
+
+
+class TopUser(BaseModel):
+    id: str
+    email: str
+    plan: str
+    total_minutes: int
+    total_sessions: int
+
+
+@router.get("/usage/summary", response_model=UsageSummaryResponse)
+async def get_usage_summary(db: AsyncSession = Depends(get_read_db)):
+    """
+    User and subscription counts with today's and month-to-date usage.
+
+    Read from the usage_daily aggregate (at most one row per plan and mode
+    per day), so the cost does not grow with the number of users.
+    """
+    return await usage_summary(db, billing_day())
+
+
+@router.get("/usage/daily", response_model=list[DayUsage])
+async def get_usage_daily(
+    days: int = Query(30, ge=1, le=MAX_REPORT_DAYS),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Per-day usage for the last ``days`` days, newest first."""
+    return await usage_daily(db, billing_day(), days)
+
+
+@router.get("/usage/top-users", response_model=list[TopUser])
+async def get_top_users(
+    limit: int = Query(10, ge=1),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Users with the most billed minutes overall."""
+    return await top_users(db, clamp_page_size(limit))
+
+
+@router.get("/export/{table}")
+async def export_table(
+    table: ExportTable,
+    format: ExportFormat = "csv",
+    gzip: bool = True,
+):
+    """
+    Dump a whole table as CSV or NDJSON (gzipped by default).
+
+    Streamed from a server-side cursor in unspecified order, so memory use
+    stays flat regardless of table size.
+    """
+    query, columns = export_query(table)
+    return export_response(query, columns, format, gzip, filename=table)
@@ -1,27 +1,39 @@
 """Analytics routes for tracking frontend events."""
 
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Literal, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from loguru import logger
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_read_db
+from app.models.analytics import EventRollup
+from app.services.analytics import event_buffer, to_utc_naive
+from app.services.auth import require_admin
+from app.services.rollups import bucket_start
 
 router = APIRouter()
 
+_MAX_RANGE = {"hour": timedelta(days=31), "day": timedelta(days=730)}
+
 
 class AnalyticsEvent(BaseModel):
     """Single analytics event."""
 
-    name: str
+    name: str = Field(max_length=100)
     properties: Optional[dict] = None
-    timestamp: str
+    timestamp: datetime
 
 
 class AnalyticsPayload(BaseModel):
     """Analytics payload with session and events."""
 
-    sessionId: str
-    events: list[AnalyticsEvent]
+    sessionId: str = Field(max_length=100)
+    events: list[AnalyticsEvent] = Field(max_length=settings.analytics_max_events_per_request)
 
 
 @router.post("/events")
@@ -29,17 +41,103 @@ async def receive_events(payload: AnalyticsPayload):
     """
     Receive analytics events from the frontend.
 
-    Currently logs events for debugging. Can be extended to store
-    in database or forward to analytics service.
+    Events are queued in memory and written to ``analytics_events`` in
+    batches by a background writer, so requests never wait on the database.
+    If the buffer is full, excess events are dropped and reported back.
     """
-    logger.debug(
-        f"Analytics: session {payload.sessionId[:8]}, "
-        f"events: {[e.name for e in payload.events]}"
+    rows = [
+        {
+            "session_id": payload.sessionId,
+            "name": event.name,
+            "properties": event.properties,
+            "occurred_at": to_utc_naive(event.timestamp),
+        }
+        for event in payload.events
+    ]
+    accepted = event_buffer.offer(rows)
+
+    if rows and not accepted:
+        logger.warning(f"Analytics buffer full, shedding {len(rows)} events")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics buffer full",
+            headers={"Retry-After": "5"},
+        )
+
+    return {"received": accepted, "dropped": len(rows) - accepted}
+
+
+class RollupPoint(BaseModel):
+    bucket_start: datetime
+    name: str
+    events: int
+    sessions: int
+
+
+class RollupSeriesResponse(BaseModel):
+    granularity: str
+    start: datetime
+    end: datetime
+    points: list[RollupPoint]
+
+
+@router.get(
+    "/rollups",
+    response_model=RollupSeriesResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def get_rollups(
+    granularity: Literal["hour", "day"] = "hour",
+    name: Optional[str] = Query(None, description="Event name; '*' for all events combined"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Time series of event and distinct-session counts.
+
+    Served entirely from the pre-aggregated rollups, so cost depends on the
+    number of buckets returned, not on how many raw events were ingested.
+    Defaults to the last 7 days; ranges are capped at ``_MAX_RANGE``.
+    """
+    end = to_utc_naive(end) if end else datetime.utcnow()
+    start = to_utc_naive(start) if start else end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end",
+        )
+    if end - start > _MAX_RANGE[granularity]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range too large for {granularity} buckets",
+        )
+
+    query = (
+        select(EventRollup)
+        .where(
+            EventRollup.granularity == granularity,
+            EventRollup.bucket_start >= bucket_start(start, granularity),
+            EventRollup.bucket_start < end,
+        )
+        .order_by(EventRollup.bucket_start, EventRollup.name)
     )
+    if name is not None:
+        query = query.where(EventRollup.name == name)
 
-    # In production, you could:
-    # - Store in database for analysis
-    # - Forward to analytics service (PostHog, Amplitude, etc.)
-    # - Aggregate metrics
+    result = await db.execute(query)
 
-    return {"received": len(payload.events)}
+    return RollupSeriesResponse(
+        granularity=granularity,
+        start=start,
+        end=end,
+        points=[
+            RollupPoint(
+                bucket_start=r.bucket_start,
+                name=r.name,
+                events=r.event_count,
+                sessions=r.session_count,
+            )
+            for r in result.scalars()
+        ],
+    )
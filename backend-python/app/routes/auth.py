@@ -3,7 +3,7 @@ from pydantic import BaseModel, EmailStr
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.subscription import Subscription
 from app.services.auth import (
@@ -12,6 +12,8 @@ from app.services.auth import (
     verify_password,
     get_current_user,
 )
+from app.services.entitlements import get_entitlement, invalidate_entitlement
+from app.services.principals import principal_cache
 
 router = APIRouter()
 
@@ -60,7 +62,7 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
     # Create user
     user = User(
         email=request.email,
-        password_hash=get_password_hash(request.password),
+        password_hash=await get_password_hash(request.password),
         name=request.name,
     )
     db.add(user)
@@ -70,6 +72,7 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
     subscription = Subscription(user_id=user.id, plan="free")
     db.add(subscription)
     await db.commit()
+    invalidate_entitlement(user.id)
 
     # Generate token
     token = create_access_token({"sub": user.id, "email": user.email})
@@ -91,18 +94,14 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == request.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(request.password, user.password_hash):
+    if not user or not await verify_password(request.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
 
     # Get subscription
-    sub_result = await db.execute(
-        select(Subscription).where(Subscription.user_id == user.id)
-    )
-    subscription = sub_result.scalar_one_or_none()
-    plan = subscription.plan if subscription else "free"
+    entitlement = await get_entitlement(db, user.id)
 
     # Generate token
     token = create_access_token({"sub": user.id, "email": user.email})
@@ -112,7 +111,7 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
             id=user.id,
             email=user.email,
             name=user.name,
-            plan=plan,
+            plan=entitlement.plan,
         ),
         token=token,
     )
@@ -121,20 +120,16 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
 @router.get("/me", response_model=UserResponse)
 async def get_me(
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get current user profile."""
-    sub_result = await db.execute(
-        select(Subscription).where(Subscription.user_id == user.id)
-    )
-    subscription = sub_result.scalar_one_or_none()
-    plan = subscription.plan if subscription else "free"
+    entitlement = await get_entitlement(db, user.id)
 
     return UserResponse(
         id=user.id,
         email=user.email,
         name=user.name,
-        plan=plan,
+        plan=entitlement.plan,
     )
 
 
@@ -145,20 +140,20 @@ async def update_me(
     db: AsyncSession = Depends(get_db),
 ):
     """Update current user profile."""
+    # The dependency may hand back a cached, shared instance; edit this
+    # session's copy and drop the cached one.
+    user = await db.get(User, user.id)
     if request.name is not None:
         user.name = request.name
 
     await db.commit()
+    principal_cache.invalidate_user(user.id)
 
-    sub_result = await db.execute(
-        select(Subscription).where(Subscription.user_id == user.id)
-    )
-    subscription = sub_result.scalar_one_or_none()
-    plan = subscription.plan if subscription else "free"
+    entitlement = await get_entitlement(db, user.id)
 
     return UserResponse(
         id=user.id,
         email=user.email,
         name=user.name,
-        plan=plan,
+        plan=entitlement.plan,
     )
@@ -0,0 +1,58 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_db
+from app.services.billing import (
+    WebhookSignatureError,
+    check_event,
+    record_event,
+    stripe_event_worker,
+    verify_signature,
+)
+
+router = APIRouter()
+
+
+@router.post("/webhook")
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Receive a Stripe event.
+
+    Verifies the signature, stores the event once (redeliveries are
+    acknowledged without being stored again) and returns straight away;
+    subscription changes are applied by the background event worker.
+    """
+    if not settings.stripe_webhook_secret:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Stripe webhooks are not configured",
+        )
+
+    payload = await request.body()
+    try:
+        verify_signature(
+            payload,
+            request.headers.get("stripe-signature"),
+            settings.stripe_webhook_secret,
+            settings.stripe_webhook_tolerance_seconds,
+        )
+        event = json.loads(payload.decode())
+        check_event(event)
+    except (WebhookSignatureError, ValueError) as exc:
+        logger.warning(f"Rejected Stripe webhook: {exc}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Webhook verification failed",
+        )
+
+    stored = await record_event(db, event, payload)
+    # Commit before waking the worker so it sees the event
+    await db.commit()
+    if stored:
+        stripe_event_worker.notify()
+
+    return {"received": True, "duplicate": not stored}
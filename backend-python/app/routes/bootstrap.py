@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_read_db
+from app.models.user import User
+from app.routes.auth import UserResponse
+from app.routes.sessions import SessionResponse
+from app.routes.subscriptions import UsageResponse
+from app.services.auth import get_current_user
+from app.services.entitlements import get_entitlement
+from app.services.sessions import active_sessions
+
+router = APIRouter()
+
+
+class SubscriptionSummary(BaseModel):
+    plan: str
+    status: str
+    current_period_start: Optional[datetime] = None
+    current_period_end: Optional[datetime] = None
+
+
+class BootstrapResponse(BaseModel):
+    user: UserResponse
+    subscription: SubscriptionSummary
+    usage: UsageResponse
+    can_start: bool
+    active_session: Optional[SessionResponse] = None
+
+
+@router.get("/bootstrap", response_model=BootstrapResponse)
+async def bootstrap(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Everything the app needs on launch, in one request.
+
+    Replaces /auth/me, /subscriptions/current, /subscriptions/usage and
+    /sessions/active. Costs at most two queries (the entitlement join and
+    the open-session lookup), and none when both are served from memory.
+    """
+    entitlement = await get_entitlement(db, user.id)
+    session = await active_sessions.lookup(db, user.id)
+
+    return BootstrapResponse(
+        user=UserResponse(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            plan=entitlement.plan,
+        ),
+        subscription=SubscriptionSummary(
+            plan=entitlement.plan,
+            status=entitlement.status,
+            current_period_start=entitlement.current_period_start,
+            current_period_end=entitlement.current_period_end,
+        ),
+        usage=UsageResponse(
+            minutes_used=entitlement.minutes_used,
+            minutes_remaining=entitlement.minutes_remaining,
+            daily_limit=entitlement.daily_limit,
+            plan=entitlement.plan,
+        ),
+        can_start=entitlement.can_start,
+        active_session=SessionResponse(
+            id=session.id,
+            mode=session.mode,
+            started_at=session.started_at,
+            messages_count=session.messages_count,
+        ) if session else None,
+    )
@@ -1,17 +1,26 @@
-from datetime import date, datetime
+import asyncio
+from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.config import settings
+from app.database import async_session, get_db, get_read_db
 from app.models.user import User
-from app.models.session import PracticeSession
-from app.models.usage import UsageRecord
-from app.models.subscription import Subscription, PLAN_LIMITS
-from app.services.auth import get_current_user, get_current_user_optional
+from app.models.session import PracticeSession, PRACTICE_MODES
+from app.models.stats import UserStats
+from app.services.auth import authenticate_token, get_current_user, get_current_user_optional
+from app.services.archive import archived_session_months
+from app.services.entitlements import get_entitlement, invalidate_entitlement
+from app.services.export import ExportFormat, export_query, export_response
+from app.services.metering import usage_meter
+from app.services.pagination import clamp_page_size, decode_cursor, encode_cursor
+from app.services.sessions import active_sessions, correct_reaped_session, finish_session
+from app.services.stats import summarize
+from app.services.usage import billing_day
 
 router = APIRouter()
 
@@ -25,6 +34,14 @@ class EndSessionRequest(BaseModel):
     messages_count: int = 0
 
 
+class HeartbeatResponse(BaseModel):
+    session_id: str
+    used_seconds: int
+    remaining_seconds: int
+    limit_reached: bool
+    ended: bool
+
+
 class SessionResponse(BaseModel):
     id: str
     mode: str
@@ -45,32 +62,16 @@ async def start_session(
 ):
     """Start a new practice session."""
     # Validate mode
-    if request.mode not in ["everyday", "slang", "workplace"]:
+    if request.mode not in PRACTICE_MODES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid mode. Must be 'everyday', 'slang', or 'workplace'",
         )
 
     # Check usage limits
-    today = date.today()
-
-    sub_result = await db.execute(
-        select(Subscription).where(Subscription.user_id == user.id)
-    )
-    subscription = sub_result.scalar_one_or_none()
-    plan = subscription.plan if subscription else "free"
-    daily_limit = PLAN_LIMITS.get(plan, PLAN_LIMITS["free"])["daily_minutes"]
-
-    usage_result = await db.execute(
-        select(UsageRecord).where(
-            UsageRecord.user_id == user.id,
-            UsageRecord.date == today,
-        )
-    )
-    usage = usage_result.scalar_one_or_none()
-    minutes_used = usage.minutes_used if usage else 0
+    entitlement = await get_entitlement(db, user.id)
 
-    if minutes_used >= daily_limit:
+    if not entitlement.can_start:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Daily limit reached. Please upgrade your plan.",
@@ -84,6 +85,7 @@ async def start_session(
     db.add(session)
     await db.commit()
     await db.refresh(session)
+    active_sessions.add(session)
 
     return SessionResponse(
         id=session.id,
@@ -115,39 +117,21 @@ async def end_session(
             detail="Session not found",
         )
 
-    # Update session
-    session.ended_at = datetime.utcnow()
-    session.duration_seconds = int(
-        (session.ended_at - session.started_at).total_seconds()
-    )
-    session.feedback = request.feedback
-    session.messages_count = request.messages_count
-
-    # Update usage
-    today = date.today()
-    duration_minutes = max(1, session.duration_seconds // 60)
-
-    usage_result = await db.execute(
-        select(UsageRecord).where(
-            UsageRecord.user_id == user.id,
-            UsageRecord.date == today,
-        )
-    )
-    usage = usage_result.scalar_one_or_none()
-
-    if usage:
-        usage.minutes_used += duration_minutes
-        usage.sessions_count += 1
-    else:
-        usage = UsageRecord(
-            user_id=user.id,
-            date=today,
-            minutes_used=duration_minutes,
-            sessions_count=1,
-        )
-        db.add(usage)
+    # Close and bill the session. If the reaper closed it without a single
+    # heartbeat to go on, the client's end corrects its duration; otherwise
+    # an already ended session only records the client's feedback
+    values = {"feedback": request.feedback, "messages_count": request.messages_count}
+    ended = await finish_session(db, session, **values)
+    if not ended:
+        ended = await correct_reaped_session(db, session, **values)
+    if not ended:
+        session.feedback = request.feedback
+        session.messages_count = request.messages_count
 
     await db.commit()
+    usage_meter.close(session.id)
+    active_sessions.remove(user.id, session.id)
+    invalidate_entitlement(user.id)
     await db.refresh(session)
 
     return SessionResponse(
@@ -160,22 +144,94 @@ async def end_session(
     )
 
 
-@router.get("/active")
-async def get_active_session(
+async def _get_open_session(db: AsyncSession, session_id: str, user_id: str) -> Optional[PracticeSession]:
+    result = await db.execute(
+        select(PracticeSession).where(
+            PracticeSession.id == session_id,
+            PracticeSession.user_id == user_id,
+            PracticeSession.ended_at.is_(None),
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+@router.post("/{session_id}/heartbeat", response_model=HeartbeatResponse)
+async def session_heartbeat(
+    session_id: str,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get the user's currently active session."""
-    result = await db.execute(
-        select(PracticeSession)
-        .where(
-            PracticeSession.user_id == user.id,
-            PracticeSession.ended_at.is_(None),
+    """
+    Meter a live session; send every few seconds while it is in progress.
+
+    Once the daily limit runs out the session is ended and
+    ``limit_reached`` is returned.
+    """
+    session = await _get_open_session(db, session_id, user.id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found",
         )
-        .order_by(PracticeSession.started_at.desc())
-        .limit(1)
+
+    meter = await usage_meter.heartbeat(db, session)
+    await db.commit()
+
+    return HeartbeatResponse(
+        session_id=session.id,
+        used_seconds=int(meter.used_seconds),
+        remaining_seconds=meter.remaining_seconds,
+        limit_reached=meter.limit_reached,
+        ended=meter.ended,
     )
-    session = result.scalar_one_or_none()
+
+
+@router.websocket("/{session_id}/ws")
+async def session_socket(websocket: WebSocket, session_id: str, token: str = ""):
+    """
+    Meter a live session over a WebSocket (auth via ``?token=``).
+
+    The server ticks every ``metering_tick_seconds`` and on every client
+    message, replying with a usage update; a ``limit_reached`` message is
+    pushed as soon as the quota runs out, after which the socket closes.
+    """
+    async with async_session() as db:
+        user = await authenticate_token(token, db) if token else None
+        session = await _get_open_session(db, session_id, user.id) if user else None
+    if session is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            async with async_session() as db:
+                meter = await usage_meter.heartbeat(db, session)
+                await db.commit()
+            await websocket.send_json(meter.as_message())
+            if meter.ended:
+                break
+
+            try:
+                await asyncio.wait_for(websocket.receive_text(), timeout=settings.metering_tick_seconds)
+            except asyncio.TimeoutError:
+                pass
+            if meter.ended:
+                # Ended through POST /end while we were waiting
+                await websocket.send_json(meter.as_message())
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.get("/active")
+async def get_active_session(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get the user's currently active session."""
+    session = await active_sessions.lookup(db, user.id)
 
     if not session:
         return {"session": None}
@@ -190,21 +246,60 @@ async def get_active_session(
     }
 
 
+@router.get("/stats")
+async def get_session_stats(
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Progress stats: sessions and minutes per mode, feedback, streaks.
+
+    Served from the incrementally maintained user_stats row, one primary-key
+    read regardless of how long the user's history is.
+    """
+    stats = await db.get(UserStats, user.id)
+    return summarize(stats, billing_day())
+
+
 @router.get("/history")
 async def get_session_history(
-    limit: int = 10,
+    limit: int = Query(10, ge=1),
+    cursor: Optional[str] = None,
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get session history."""
-    result = await db.execute(
+    """
+    Get session history, newest first.
+
+    Keyset-paginated on (started_at, id): pass ``next_cursor`` back as
+    ``cursor`` for the next page. Page size is capped server-side. Sessions
+    older than the archive horizon only exist as monthly totals; those come
+    back as ``archived_months`` on the last page.
+    """
+    limit = clamp_page_size(limit)
+    query = (
         select(PracticeSession)
         .where(PracticeSession.user_id == user.id)
-        .order_by(PracticeSession.started_at.desc())
-        .limit(limit)
+        .order_by(PracticeSession.started_at.desc(), PracticeSession.id.desc())
+        .limit(limit + 1)
     )
+    if cursor:
+        started_at, session_id = decode_cursor(cursor, datetime, str)
+        query = query.where(
+            tuple_(PracticeSession.started_at, PracticeSession.id) < tuple_(started_at, session_id)
+        )
+
+    result = await db.execute(query)
     sessions = result.scalars().all()
 
+    next_cursor = None
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        last = sessions[-1]
+        next_cursor = encode_cursor(last.started_at, last.id)
+
+    archived = [] if next_cursor else await archived_session_months(db, user.id)
+
     return {
         "sessions": [
             {
@@ -217,5 +312,35 @@ async def get_session_history(
                 "feedback": s.feedback,
             }
             for s in sessions
-        ]
+        ],
+        "archived_months": [
+            {
+                "month": m.month.isoformat(),
+                "mode": m.mode,
+                "sessions": m.sessions,
+                "duration_seconds": m.duration_seconds,
+                "messages_count": m.messages_count,
+            }
+            for m in archived
+        ],
+        "next_cursor": next_cursor,
     }
+
+
+@router.get("/history/export")
+async def export_session_history(
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+    user: User = Depends(get_current_user),
+):
+    """
+    Download the user's full session history as NDJSON or CSV.
+
+    Streamed from a server-side cursor, oldest first; memory use does not
+    depend on how many sessions the user has.
+    """
+    query, columns = export_query("practice_sessions")
+    query = query.where(PracticeSession.user_id == user.id).order_by(
+        PracticeSession.started_at, PracticeSession.id
+    )
+    return export_response(query, columns, format, gzip, filename="practice_sessions")
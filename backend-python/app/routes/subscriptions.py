@@ -1,19 +1,27 @@
 from datetime import date, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_read_db
 from app.models.user import User
-from app.models.subscription import Subscription, PLAN_LIMITS
 from app.models.usage import UsageRecord
 from app.services.auth import get_current_user
+from app.services.archive import archived_usage_months
+from app.services.entitlements import get_entitlement
+from app.services.export import ExportFormat, export_query, export_response
+from app.services.pagination import clamp_page_size, decode_cursor, encode_cursor
+from app.services.plans import plan_catalogue
+from app.services.usage import billing_day
 
 router = APIRouter()
 
+MAX_HISTORY_DAYS = 366
+
 
 class PlanResponse(BaseModel):
     plan: str
@@ -35,131 +43,132 @@ class CanStartResponse(BaseModel):
 
 
 @router.get("/plans", response_model=list[PlanResponse])
-async def get_plans():
-    """Get all subscription plans."""
-    return [
-        PlanResponse(plan=plan, **limits)
-        for plan, limits in PLAN_LIMITS.items()
-    ]
+async def get_plans(request: Request):
+    """
+    Get all subscription plans.
+
+    Served from the in-process plan catalogue as pre-serialized bytes with
+    a strong ETag; conditional requests get a 304.
+    """
+    snapshot = plan_catalogue.snapshot
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": f"public, max-age={int(settings.plan_catalogue_refresh_seconds)}",
+    }
+
+    if plan_catalogue.etag_matches(request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
 
 @router.get("/current")
 async def get_current_subscription(
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get current user's subscription."""
-    result = await db.execute(
-        select(Subscription).where(Subscription.user_id == user.id)
-    )
-    subscription = result.scalar_one_or_none()
+    entitlement = await get_entitlement(db, user.id)
 
-    if not subscription:
+    if not entitlement.has_subscription:
         return {"plan": "free", "status": "active"}
 
     return {
-        "plan": subscription.plan,
-        "status": subscription.status,
-        "current_period_start": subscription.current_period_start,
-        "current_period_end": subscription.current_period_end,
+        "plan": entitlement.plan,
+        "status": entitlement.status,
+        "current_period_start": entitlement.current_period_start,
+        "current_period_end": entitlement.current_period_end,
     }
 
 
 @router.get("/usage", response_model=UsageResponse)
 async def get_usage(
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get current user's usage for today."""
-    today = date.today()
-
-    # Get subscription
-    sub_result = await db.execute(
-        select(Subscription).where(Subscription.user_id == user.id)
-    )
-    subscription = sub_result.scalar_one_or_none()
-    plan = subscription.plan if subscription else "free"
-    daily_limit = PLAN_LIMITS.get(plan, PLAN_LIMITS["free"])["daily_minutes"]
-
-    # Get today's usage
-    usage_result = await db.execute(
-        select(UsageRecord).where(
-            UsageRecord.user_id == user.id,
-            UsageRecord.date == today,
-        )
-    )
-    usage = usage_result.scalar_one_or_none()
-    minutes_used = usage.minutes_used if usage else 0
+    entitlement = await get_entitlement(db, user.id)
 
     return UsageResponse(
-        minutes_used=minutes_used,
-        minutes_remaining=max(0, daily_limit - minutes_used),
-        daily_limit=daily_limit,
-        plan=plan,
+        minutes_used=entitlement.minutes_used,
+        minutes_remaining=entitlement.minutes_remaining,
+        daily_limit=entitlement.daily_limit,
+        plan=entitlement.plan,
     )
 
 
 @router.get("/check", response_model=CanStartResponse)
 async def check_can_start(
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Check if user can start a new session."""
-    today = date.today()
-
-    # Get subscription
-    sub_result = await db.execute(
-        select(Subscription).where(Subscription.user_id == user.id)
-    )
-    subscription = sub_result.scalar_one_or_none()
-    plan = subscription.plan if subscription else "free"
-    daily_limit = PLAN_LIMITS.get(plan, PLAN_LIMITS["free"])["daily_minutes"]
-
-    # Get today's usage
-    usage_result = await db.execute(
-        select(UsageRecord).where(
-            UsageRecord.user_id == user.id,
-            UsageRecord.date == today,
-        )
-    )
-    usage = usage_result.scalar_one_or_none()
-    minutes_used = usage.minutes_used if usage else 0
-    remaining = max(0, daily_limit - minutes_used)
+    entitlement = await get_entitlement(db, user.id)
 
-    if remaining <= 0:
+    if not entitlement.can_start:
         return CanStartResponse(
             allowed=False,
-            message=f"You've used all {daily_limit} minutes for today. Upgrade for more time!",
+            message=f"You've used all {entitlement.daily_limit} minutes for today. Upgrade for more time!",
             remaining=0,
         )
 
     return CanStartResponse(
         allowed=True,
-        remaining=remaining,
+        remaining=entitlement.minutes_remaining,
     )
 
 
 @router.get("/history")
 async def get_usage_history(
-    days: int = 30,
+    days: int = Query(30, ge=1),
+    limit: int = Query(31, ge=1),
+    cursor: Optional[str] = None,
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get usage history for the past N days."""
-    start_date = date.today() - timedelta(days=days)
+    """
+    Get usage history for the past N days, newest first.
+
+    Keyset-paginated on (date, id); ``days`` and page size are capped
+    server-side. The window total is computed by the database. Days older
+    than the archive horizon only exist as monthly totals: they come back
+    as ``archived_months`` on the last page and count whole in the total.
+    """
+    days = min(days, MAX_HISTORY_DAYS)
+    limit = clamp_page_size(limit)
+    start_date = billing_day() - timedelta(days=days)
+    in_window = (
+        UsageRecord.user_id == user.id,
+        UsageRecord.date >= start_date,
+    )
 
-    result = await db.execute(
+    query = (
         select(UsageRecord)
-        .where(
-            UsageRecord.user_id == user.id,
-            UsageRecord.date >= start_date,
-        )
-        .order_by(UsageRecord.date.desc())
+        .where(*in_window)
+        .order_by(UsageRecord.date.desc(), UsageRecord.id.desc())
+        .limit(limit + 1)
     )
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor, date, str)
+        query = query.where(
+            tuple_(UsageRecord.date, UsageRecord.id) < tuple_(cursor_date, cursor_id)
+        )
+
+    result = await db.execute(query)
     records = result.scalars().all()
 
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        next_cursor = encode_cursor(last.date, last.id)
+
     # Calculate monthly total
-    monthly_total = sum(r.minutes_used for r in records)
+    total_result = await db.execute(
+        select(func.coalesce(func.sum(UsageRecord.minutes_used), 0)).where(*in_window)
+    )
+    archived = await archived_usage_months(db, user.id, start_date)
+    monthly_total = total_result.scalar_one() + sum(m.minutes for m in archived)
 
     return {
         "history": [
@@ -170,5 +179,27 @@ async def get_usage_history(
             }
             for r in records
         ],
+        "archived_months": [
+            {
+                "month": m.month.isoformat(),
+                "minutes_used": m.minutes,
+                "sessions_count": m.sessions,
+                "active_days": m.active_days,
+            }
+            for m in ([] if next_cursor else archived)
+        ],
         "monthly_total_minutes": monthly_total,
+        "next_cursor": next_cursor,
     }
+
+
+@router.get("/history/export")
+async def export_usage_history(
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+    user: User = Depends(get_current_user),
+):
+    """Download the user's full daily usage history as NDJSON or CSV."""
+    query, columns = export_query("usage_records")
+    query = query.where(UsageRecord.user_id == user.id).order_by(UsageRecord.date)
+    return export_response(query, columns, format, gzip, filename="usage_records")
@@ -0,0 +1,62 @@
+"""
+Production entrypoint: migrate once, then serve with N worker processes.
+
+    python -m app.serve
+
+The worker count comes from ``Settings.worker_count()`` (WEB_CONCURRENCY,
+or one per available CPU capped at MAX_WORKERS; always 1 on SQLite unless
+SQLITE_ALLOW_MULTIPLE_WORKERS is set). Schema creation and migrations run
+here, in the parent, before any worker starts; workers are told to skip
+them so N processes never race to migrate the same database.
+"""
+
+import asyncio
+import os
+import sys
+
+from loguru import logger
+
+from app.config import settings
+
+
+async def _migrate() -> None:
+    from app.database import engine, init_db
+
+    try:
+        await init_db(force=True)
+    finally:
+        await engine.dispose()
+
+
+def main() -> int:
+    import uvicorn
+
+    workers = settings.worker_count()
+    if settings.database_url.startswith("sqlite") and workers > 1:
+        logger.warning(
+            f"Serving SQLite from {workers} workers; writes will contend for the database lock"
+        )
+
+    if not settings.skip_schema_creation:
+        asyncio.run(_migrate())
+        logger.info("Database schema is up to date")
+
+    # Inherited by the workers, which re-read Settings on import. With a
+    # single worker uvicorn serves from this process, whose Settings were
+    # read already, so set the flag on them too
+    os.environ["SKIP_SCHEMA_CREATION"] = "true"
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    settings.skip_schema_creation = True
+
+    logger.info(f"Starting {workers} worker(s) on {settings.host}:{settings.port}")
+    uvicorn.run(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,9 @@ from app.services.auth import (
     get_password_hash,
     get_current_user,
     get_current_user_optional,
+    require_admin,
 )
+from app.services.principals import principal_cache
 
 __all__ = [
     "create_access_token",
@@ -12,4 +14,6 @@ __all__ = [
     "get_password_hash",
     "get_current_user",
     "get_current_user_optional",
+    "require_admin",
+    "principal_cache",
 ]
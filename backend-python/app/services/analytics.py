@@ -0,0 +1,159 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import async_session
+from app.models.analytics import EventRecord
+from app.services.rollups import apply_rollups, prune_rollup_sessions
+
+_PRUNE_INTERVAL_SECONDS = 3600
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Store timestamps the way the rest of the schema does: naive UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class EventBuffer:
+    """
+    Bounded in-memory buffer between the analytics route and the database.
+
+    The route only enqueues; a single background writer drains the queue
+    and inserts rows in bulk, flushing when ``batch_size`` rows are
+    waiting or ``flush_interval`` seconds after the first row of a batch
+    arrived, whichever comes first. Each batch also updates the hourly
+    and daily rollups in the same transaction. When the queue is full new
+    events are shed and counted rather than slowing requests down.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        batch_size: int,
+        flush_interval: float,
+        rollup_session_retention: timedelta = timedelta(hours=48),
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rollup_session_retention = rollup_session_retention
+        self.accepted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._last_prune = float("-inf")
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def offer(self, rows: list[dict]) -> int:
+        """Enqueue rows without waiting; returns how many were accepted."""
+        accepted = 0
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+            except asyncio.QueueFull:
+                break
+            accepted += 1
+
+        self.accepted += accepted
+        self.dropped += len(rows) - accepted
+        return accepted
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="analytics-writer")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything still buffered, then stop the writer."""
+        if self._task is None:
+            return
+
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Analytics writer did not drain in {timeout}s; {self.depth} events lost")
+        finally:
+            self._task = None
+
+    async def _run(self) -> None:
+        while not (self._closing and self._queue.empty()):
+            batch = await self._collect()
+            if batch:
+                await self._write(batch)
+
+    async def _collect(self) -> list[dict]:
+        """Wait for a first row, then fill the batch until size or time runs out."""
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+        except asyncio.TimeoutError:
+            return []
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        batch = [first]
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - loop.time()
+            if self._closing or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _write(self, batch: list[dict]) -> None:
+        try:
+            async with async_session() as session:
+                await session.execute(insert(EventRecord), batch)
+                await apply_rollups(session, batch, self.rollup_session_retention)
+                if time.monotonic() - self._last_prune >= _PRUNE_INTERVAL_SECONDS:
+                    await prune_rollup_sessions(session, self.rollup_session_retention)
+                    self._last_prune = time.monotonic()
+                await session.commit()
+        except Exception:
+            self.failed += len(batch)
+            logger.exception(f"Failed to write {len(batch)} analytics events")
+            return
+
+        self.written += len(batch)
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+event_buffer = EventBuffer(
+    maxsize=settings.analytics_queue_size,
+    batch_size=settings.analytics_batch_size,
+    flush_interval=settings.analytics_flush_interval_seconds,
+    rollup_session_retention=timedelta(hours=settings.analytics_rollup_session_retention_hours),
+)
@@ -0,0 +1,251 @@
+"""
+Retention for practice_sessions and usage_records.
+
+Rows from before the archive cutoff (the start of the month that was
+``archive_retention_days`` ago) are rolled up into monthly_summaries and
+deleted, ``archive_batch_size`` at a time. Each batch is one short
+transaction: a DELETE ... RETURNING of the oldest rows followed by an
+additive upsert of their totals, so a batch is either archived whole or
+not at all, and two workers archiving at once never count a row twice.
+Run by hand with:
+
+    python -m app.services.archive run [retention_days]
+"""
+
+import asyncio
+import sys
+from datetime import date, timedelta
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session, dialect_insert
+from app.models.archive import MonthlySummary
+from app.models.reporting import ALL_MODES
+from app.models.session import PracticeSession
+from app.models.usage import UsageRecord
+from app.services.schedule import DailyJob
+from app.services.usage import billing_day, day_start
+
+_COUNTERS = (
+    "sessions",
+    "minutes",
+    "duration_seconds",
+    "messages_count",
+    "feedback_positive",
+    "feedback_total",
+    "active_days",
+)
+
+
+def archive_cutoff(today: date, retention_days: int) -> date:
+    """
+    First day still kept in the hot tables.
+
+    Aligned to a month boundary so a month is never split between the hot
+    and archived tiers.
+    """
+    return (today - timedelta(days=retention_days)).replace(day=1)
+
+
+def _month(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _summary(user_id: str, month: date, mode: str) -> dict:
+    return {"user_id": user_id, "month": month, "mode": mode, **{c: 0 for c in _COUNTERS}}
+
+
+async def _add_to_summaries(db: AsyncSession, rows: list[dict]) -> None:
+    insert = dialect_insert(db)
+    stmt = insert(MonthlySummary)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MonthlySummary.user_id, MonthlySummary.month, MonthlySummary.mode],
+        set_={
+            **{c: getattr(MonthlySummary, c) + getattr(stmt.excluded, c) for c in _COUNTERS},
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt, rows)
+
+
+async def archive_sessions_batch(db: AsyncSession, cutoff: date, batch_size: int) -> int:
+    """Move up to ``batch_size`` ended sessions from before ``cutoff`` into summaries."""
+    oldest = (
+        select(PracticeSession.id)
+        .where(
+            PracticeSession.started_at < day_start(cutoff),
+            PracticeSession.ended_at.is_not(None),
+        )
+        .limit(batch_size)
+    )
+    result = await db.execute(
+        delete(PracticeSession)
+        .where(PracticeSession.id.in_(oldest.scalar_subquery()))
+        .returning(
+            PracticeSession.user_id,
+            PracticeSession.mode,
+            PracticeSession.started_at,
+            PracticeSession.duration_seconds,
+            PracticeSession.metered_minutes,
+            PracticeSession.messages_count,
+            PracticeSession.feedback,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    archived = result.all()
+
+    summaries: dict[tuple, dict] = {}
+    for user_id, mode, started_at, duration_seconds, minutes, messages_count, feedback in archived:
+        key = (user_id, _month(billing_day(started_at)), mode)
+        row = summaries.setdefault(key, _summary(*key))
+        row["sessions"] += 1
+        row["minutes"] += minutes
+        row["duration_seconds"] += duration_seconds or 0
+        row["messages_count"] += messages_count
+        row["feedback_positive"] += int(feedback is True)
+        row["feedback_total"] += int(feedback is not None)
+
+    if summaries:
+        await _add_to_summaries(db, list(summaries.values()))
+    return len(archived)
+
+
+async def archive_usage_batch(db: AsyncSession, cutoff: date, batch_size: int) -> int:
+    """Move up to ``batch_size`` usage days from before ``cutoff`` into summaries."""
+    oldest = select(UsageRecord.id).where(UsageRecord.date < cutoff).limit(batch_size)
+    result = await db.execute(
+        delete(UsageRecord)
+        .where(UsageRecord.id.in_(oldest.scalar_subquery()))
+        .returning(
+            UsageRecord.user_id,
+            UsageRecord.date,
+            UsageRecord.minutes_used,
+            UsageRecord.sessions_count,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    archived = result.all()
+
+    summaries: dict[tuple, dict] = {}
+    for user_id, day, minutes_used, sessions_count in archived:
+        key = (user_id, _month(day), ALL_MODES)
+        row = summaries.setdefault(key, _summary(*key))
+        row["sessions"] += sessions_count
+        row["minutes"] += minutes_used
+        row["active_days"] += 1
+
+    if summaries:
+        await _add_to_summaries(db, list(summaries.values()))
+    return len(archived)
+
+
+async def archived_session_months(db: AsyncSession, user_id: str) -> list[MonthlySummary]:
+    """The user's archived sessions per month and mode, newest first."""
+    result = await db.execute(
+        select(MonthlySummary)
+        .where(MonthlySummary.user_id == user_id, MonthlySummary.mode != ALL_MODES)
+        .order_by(MonthlySummary.month.desc(), MonthlySummary.mode)
+    )
+    return list(result.scalars())
+
+
+async def first_unarchived_day(db: AsyncSession) -> Optional[date]:
+    """The day after the newest archived month, or None if nothing is archived."""
+    newest = await db.scalar(select(func.max(MonthlySummary.month)))
+    if newest is None:
+        return None
+    return (newest + timedelta(days=31)).replace(day=1)
+
+
+async def archived_usage_months(db: AsyncSession, user_id: str, since: date) -> list[MonthlySummary]:
+    """The user's archived usage for months overlapping ``since`` onwards, newest first."""
+    result = await db.execute(
+        select(MonthlySummary)
+        .where(
+            MonthlySummary.user_id == user_id,
+            MonthlySummary.mode == ALL_MODES,
+            MonthlySummary.month >= _month(since),
+        )
+        .order_by(MonthlySummary.month.desc())
+    )
+    return list(result.scalars())
+
+
+class ArchiveJob(DailyJob):
+    """Nightly archiving of rows older than ``retention_days``."""
+
+    name = "archive-job"
+
+    def __init__(self, hour: int, retention_days: int, batch_size: int, pause: float):
+        super().__init__(hour)
+        self.retention_days = retention_days
+        self.batch_size = max(1, batch_size)
+        self.pause = pause
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    async def run(self) -> None:
+        await self.archive()
+
+    async def _drain(self, archive_batch, cutoff: date) -> int:
+        total = 0
+        while True:
+            async with async_session() as db:
+                moved = await archive_batch(db, cutoff, self.batch_size)
+                await db.commit()
+            total += moved
+            if moved < self.batch_size:
+                return total
+            # Let request writes in between batches (SQLite has one writer)
+            await asyncio.sleep(self.pause)
+
+    async def archive(self, today: Optional[date] = None) -> dict[str, int]:
+        """Archive everything before the cutoff; returns rows moved per table."""
+        cutoff = archive_cutoff(today or billing_day(), self.retention_days)
+        moved = {
+            "practice_sessions": await self._drain(archive_sessions_batch, cutoff),
+            "usage_records": await self._drain(archive_usage_batch, cutoff),
+        }
+        if any(moved.values()):
+            logger.info(f"Archived rows from before {cutoff}: {moved}")
+        return moved
+
+
+archive_job = ArchiveJob(
+    hour=settings.archive_hour_utc,
+    retention_days=settings.archive_retention_days,
+    batch_size=settings.archive_batch_size,
+    pause=settings.archive_batch_pause_seconds,
+)
+
+
+async def _main(argv: list[str]) -> int:
+    from app.database import engine, init_db
+
+    if not argv or argv[0] != "run":
+        print("Usage: python -m app.services.archive run [retention_days]")
+        return 2
+
+    job = ArchiveJob(
+        hour=archive_job.hour,
+        retention_days=int(argv[1]) if len(argv) > 1 else archive_job.retention_days,
+        batch_size=archive_job.batch_size,
+        pause=archive_job.pause,
+    )
+    try:
+        await init_db(force=True)
+        moved = await job.archive()
+        print(f"Archived {moved['practice_sessions']} sessions and {moved['usage_records']} usage days")
+        return 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -1,42 +1,94 @@
+import hmac
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.database import get_db
 from app.models.user import User
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.hashing import password_hasher
+from app.services.principals import principal_cache
 
 # JWT Bearer
 security = HTTPBearer(auto_error=False)
 
+# Admin API key
+admin_api_key_header = APIKeyHeader(name="X-Admin-API-Key", auto_error=False)
+
+
+# passlib/bcrypt and jose/cryptography are imported on first use, keeping
+# them off the cold-start path for workers that have not seen auth traffic.
+@lru_cache
+def password_context():
+    """Password hashing context."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
 
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash, off the event loop."""
+    return await password_hasher.run(password_context().verify, plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
+
+async def get_password_hash(password: str) -> str:
+    """Hash a password, off the event loop."""
+    return await password_hasher.run(password_context().hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.jwt_expire_minutes))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
 
+def _decode_user_id(token: str) -> Optional[str]:
+    """Return the token subject, using the principal cache when warm."""
+    user_id = principal_cache.get_user_id(token)
+    if user_id is not None:
+        return user_id
+
+    from jose import JWTError, jwt
+
+    try:
+        payload = jwt.decode(
+            token,
+            settings.jwt_secret,
+            algorithms=[settings.jwt_algorithm],
+        )
+    except JWTError:
+        return None
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+
+    principal_cache.set_user_id(token, user_id, payload.get("exp"))
+    return user_id
+
+
+async def _load_user(user_id: str, db: AsyncSession) -> Optional[User]:
+    """Return the User row, using the principal cache when warm."""
+    user = principal_cache.get_user(user_id)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        principal_cache.set_user(user)
+    return user
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
@@ -51,20 +103,11 @@ async def get_current_user(
     if not credentials:
         raise credentials_exception
 
-    try:
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.jwt_secret,
-            algorithms=[settings.jwt_algorithm],
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    user_id = _decode_user_id(credentials.credentials)
+    if user_id is None:
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await _load_user(user_id, db)
 
     if user is None:
         raise credentials_exception
@@ -80,17 +123,39 @@ async def get_current_user_optional(
     if not credentials:
         return None
 
-    try:
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.jwt_secret,
-            algorithms=[settings.jwt_algorithm],
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-    except JWTError:
+    return await authenticate_token(credentials.credentials, db)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> Optional[User]:
+    """Resolve a raw access token (e.g. from a WebSocket query string) to a user."""
+    user_id = _decode_user_id(token)
+    if user_id is None:
         return None
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    return result.scalar_one_or_none()
+    return await _load_user(user_id, db)
+
+
+# Sample values from .env.example and old deploy templates; never accepted
+_PLACEHOLDER_ADMIN_KEYS = frozenset({
+    "generate-a-strong-random-key-for-production",
+    "change-this-in-production",
+})
+
+
+def admin_api_key_configured() -> bool:
+    """Whether ADMIN_API_KEY holds a real key rather than nothing or a placeholder."""
+    key = settings.admin_api_key.strip()
+    return bool(key) and key not in _PLACEHOLDER_ADMIN_KEYS
+
+
+async def require_admin(api_key: Optional[str] = Depends(admin_api_key_header)) -> None:
+    """Guard for ops/reporting routes; disabled unless a real ADMIN_API_KEY is set."""
+    # Header values arrive latin-1 decoded; compare bytes so a non-ASCII key
+    # is just a wrong key rather than a TypeError from compare_digest.
+    if not admin_api_key_configured() or not api_key or not hmac.compare_digest(
+        api_key.encode("latin-1", "replace"), settings.admin_api_key.strip().encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unauthorized",
+        )
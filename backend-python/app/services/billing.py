@@ -0,0 +1,390 @@
+"""
+Stripe webhook ingestion.
+
+The webhook route verifies the signature, stores the event in
+stripe_events (the primary key drops redeliveries) and acknowledges.
+``StripeEventWorker`` applies pending events in the order Stripe created
+them, but Stripe may deliver them in any order, so:
+
+- ``customer.subscription.*`` events carry the whole subscription and are
+  authoritative. A subscription remembers the creation time of the last
+  one applied (``stripe_event_at``) and ignores older ones.
+- Invoice events only move the status forward ahead of the subscription
+  update Stripe sends alongside them; they are ignored when older than
+  the last applied subscription event.
+- ``checkout.session.completed`` links the Stripe ids to the user, and
+  only applies until the first subscription event has.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session, dialect_insert
+from app.models.billing import StripeEvent
+from app.models.subscription import Subscription
+from app.services.entitlements import invalidate_entitlement
+
+# Stripe subscription statuses -> ours; unlisted ones (incomplete) keep the current status
+_STATUSES = {
+    "active": "active",
+    "trialing": "active",
+    "past_due": "past_due",
+    "unpaid": "past_due",
+    "canceled": "cancelled",
+    "incomplete_expired": "cancelled",
+}
+
+
+class WebhookSignatureError(ValueError):
+    """The Stripe-Signature header is missing, malformed, stale or does not match."""
+
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """A Stripe-Signature header value for ``payload``, as Stripe computes it."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256)
+    return f"t={timestamp},v1={digest.hexdigest()}"
+
+
+def verify_signature(
+    payload: bytes,
+    header: Optional[str],
+    secret: str,
+    tolerance: int,
+    now: Optional[float] = None,
+) -> None:
+    """Check a Stripe-Signature header; raises WebhookSignatureError."""
+    if not header:
+        raise WebhookSignatureError("Missing Stripe-Signature header")
+
+    timestamp, signatures = None, []
+    for item in header.split(","):
+        key, _, value = item.strip().partition("=")
+        if key == "t" and value.isdigit():
+            timestamp = int(value)
+        elif key == "v1":
+            signatures.append(value)
+    if timestamp is None or not signatures:
+        raise WebhookSignatureError("Malformed Stripe-Signature header")
+
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > tolerance:
+        raise WebhookSignatureError("Signature timestamp outside the tolerance")
+
+    expected = sign_payload(payload, secret, timestamp).split("v1=", 1)[1]
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise WebhookSignatureError("Signature does not match")
+
+
+def check_event(event) -> None:
+    """Raise ValueError unless ``event`` carries the fields ``record_event`` stores."""
+    if not isinstance(event, dict):
+        raise ValueError("Event is not an object")
+    for field in ("id", "type"):
+        if not isinstance(event.get(field), str) or not event[field]:
+            raise ValueError(f"Event {field} is not a string")
+    created = event.get("created")
+    if isinstance(created, bool) or not isinstance(created, int):
+        raise ValueError("Event created is not a timestamp")
+    try:
+        datetime.utcfromtimestamp(created)
+    except (OverflowError, OSError, ValueError):
+        raise ValueError("Event created is out of range")
+
+
+async def record_event(db: AsyncSession, event: dict, payload: bytes) -> bool:
+    """Store a verified event (see ``check_event``); False if it was already received."""
+    insert = dialect_insert(db)
+    result = await db.execute(
+        insert(StripeEvent)
+        .values(
+            id=event["id"],
+            type=event["type"],
+            created=datetime.utcfromtimestamp(event["created"]),
+            payload=payload.decode(),
+        )
+        .on_conflict_do_nothing(index_elements=[StripeEvent.id])
+        .returning(StripeEvent.id)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+def plan_for_price(price_id: Optional[str]) -> Optional[str]:
+    """Our plan for a configured Stripe price id."""
+    prices = {
+        settings.stripe_price_basic: "basic",
+        settings.stripe_price_standard: "standard",
+        settings.stripe_price_premium: "premium",
+    }
+    prices.pop("", None)
+    return prices.get(price_id)
+
+
+def _timestamp(value: Optional[int]) -> Optional[datetime]:
+    return datetime.utcfromtimestamp(value) if value else None
+
+
+def _subscription_values(obj: dict) -> dict:
+    """Column values from a Stripe subscription object."""
+    items = (obj.get("items") or {}).get("data") or [{}]
+    item = items[0]
+    values = {
+        "stripe_customer_id": obj.get("customer"),
+        "stripe_subscription_id": obj.get("id"),
+        # Newer API versions report the period per item
+        "current_period_start": _timestamp(obj.get("current_period_start") or item.get("current_period_start")),
+        "current_period_end": _timestamp(obj.get("current_period_end") or item.get("current_period_end")),
+    }
+    if obj.get("status") in _STATUSES:
+        values["status"] = _STATUSES[obj["status"]]
+    plan = plan_for_price((item.get("price") or {}).get("id"))
+    if plan:
+        values["plan"] = plan
+    return values
+
+
+def _changes(event_type: str, obj: dict) -> Optional[tuple[str, dict, dict]]:
+    """
+    (kind, lookup keys, column values) for an event type we act on, else None.
+
+    ``kind`` is "snapshot", "status" or "link"; see the module docstring.
+
+    Lookup keys are tried in order: Stripe subscription id, our user id
+    (checkout metadata), Stripe customer id.
+    """
+    metadata = obj.get("metadata") or {}
+    user_id = metadata.get("userId") or obj.get("client_reference_id")
+
+    if event_type == "checkout.session.completed":
+        values = {
+            "stripe_customer_id": obj.get("customer"),
+            "stripe_subscription_id": obj.get("subscription"),
+            "status": "active",
+        }
+        if metadata.get("plan") in ("basic", "standard", "premium"):
+            values["plan"] = metadata["plan"]
+        keys = {"subscription": obj.get("subscription"), "user": user_id, "customer": obj.get("customer")}
+        return "link", keys, values
+
+    if event_type in ("customer.subscription.created", "customer.subscription.updated"):
+        keys = {"subscription": obj.get("id"), "user": user_id, "customer": obj.get("customer")}
+        return "snapshot", keys, _subscription_values(obj)
+
+    if event_type == "customer.subscription.deleted":
+        keys = {"subscription": obj.get("id"), "user": user_id, "customer": obj.get("customer")}
+        values = {
+            "plan": "free",
+            "status": "active",
+            "stripe_subscription_id": None,
+            "current_period_start": None,
+            "current_period_end": None,
+        }
+        return "snapshot", keys, values
+
+    if event_type in ("invoice.paid", "invoice.payment_failed"):
+        keys = {"subscription": obj.get("subscription"), "customer": obj.get("customer")}
+        return "status", keys, {"status": "active" if event_type == "invoice.paid" else "past_due"}
+
+    return None
+
+
+async def _find_subscription(db: AsyncSession, keys: dict) -> Optional[Subscription]:
+    columns = {
+        "subscription": Subscription.stripe_subscription_id,
+        "user": Subscription.user_id,
+        "customer": Subscription.stripe_customer_id,
+    }
+    for key, column in columns.items():
+        if keys.get(key):
+            result = await db.execute(select(Subscription).where(column == keys[key]).limit(1))
+            subscription = result.scalar_one_or_none()
+            if subscription is not None:
+                return subscription
+    return None
+
+
+async def apply_event(db: AsyncSession, event_type: str, created: datetime, obj: dict) -> Optional[str]:
+    """
+    Apply one event to its subscription; returns the affected user id.
+
+    Raises LookupError when no subscription matches yet (the event that
+    links the Stripe ids may not have been applied), so it is retried.
+    """
+    changes = _changes(event_type, obj)
+    if changes is None:
+        return None
+    kind, keys, values = changes
+
+    subscription = await _find_subscription(db, keys)
+    if subscription is None:
+        raise LookupError(f"No subscription matches {event_type} {keys}")
+
+    applied_at = Subscription.stripe_event_at
+    if kind == "link":
+        current = applied_at.is_(None)
+    else:
+        current = or_(applied_at.is_(None), applied_at <= created)
+    if kind == "snapshot":
+        values = {**values, "stripe_event_at": created}
+
+    result = await db.execute(
+        update(Subscription)
+        .where(Subscription.id == subscription.id, current)
+        .values(**values)
+    )
+    if result.rowcount == 0:
+        logger.info(f"Skipped stale {event_type} for user {subscription.user_id}")
+    return subscription.user_id
+
+
+class StripeEventWorker:
+    """
+    Background task that applies stored Stripe events.
+
+    Woken by the webhook route after each new event, and polls every
+    ``poll_interval`` for events stored by other workers. Each event is
+    claimed (``processed_at`` set while still NULL) and applied in one
+    transaction, so every event is applied exactly once. A failed event is
+    retried after ``retry_delay``, doubling per attempt up to
+    ``max_retry_delay``, and abandoned after ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        retry_delay: float,
+        max_retry_delay: float,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.processed = 0
+        self.failed = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="stripe-event-worker")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        """A new event was stored; process it now rather than at the next poll."""
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.drain()
+            except Exception:
+                logger.exception("Stripe event worker pass failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def drain(self) -> int:
+        """Apply pending events until none are due; returns how many were tried."""
+        total = 0
+        while True:
+            retry_at = StripeEvent.next_attempt_at
+            due = or_(retry_at.is_(None), retry_at <= datetime.utcnow())
+            async with async_session() as db:
+                result = await db.execute(
+                    select(StripeEvent.id)
+                    .where(StripeEvent.processed_at.is_(None), due)
+                    .order_by(StripeEvent.created, StripeEvent.id)
+                    .limit(self.batch_size)
+                )
+                event_ids = list(result.scalars())
+            for event_id in event_ids:
+                await self._process(event_id)
+            total += len(event_ids)
+            if len(event_ids) < self.batch_size:
+                return total
+
+    async def _process(self, event_id: str) -> None:
+        async with async_session() as db:
+            claimed = await db.execute(
+                update(StripeEvent)
+                .where(StripeEvent.id == event_id, StripeEvent.processed_at.is_(None))
+                .values(processed_at=datetime.utcnow(), attempts=StripeEvent.attempts + 1)
+                .returning(StripeEvent.type, StripeEvent.created, StripeEvent.payload, StripeEvent.attempts)
+            )
+            event = claimed.one_or_none()
+            if event is None:
+                return  # applied by another worker meanwhile
+
+            try:
+                obj = json.loads(event.payload)["data"]["object"]
+                user_id = await apply_event(db, event.type, event.created, obj)
+                await db.commit()
+            except Exception as exc:
+                await db.rollback()
+                await self._record_failure(event_id, event.attempts, exc)
+                return
+
+        self.processed += 1
+        if user_id:
+            invalidate_entitlement(user_id)
+
+    def retry_after(self, attempts: int) -> timedelta:
+        """Delay before the next try of an event that failed ``attempts`` times."""
+        return timedelta(seconds=min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1)))
+
+    async def _record_failure(self, event_id: str, attempts: int, exc: Exception) -> None:
+        abandon = attempts >= self.max_attempts
+        now = datetime.utcnow()
+        async with async_session() as db:
+            await db.execute(
+                update(StripeEvent)
+                .where(StripeEvent.id == event_id)
+                .values(
+                    attempts=attempts,
+                    error=f"{type(exc).__name__}: {exc}"[:500],
+                    # Out of attempts: park it as processed, keeping the error
+                    processed_at=now if abandon else None,
+                    next_attempt_at=None if abandon else now + self.retry_after(attempts),
+                )
+            )
+            await db.commit()
+        if abandon:
+            self.failed += 1
+            logger.error(f"Giving up on Stripe event {event_id} after {attempts} attempts: {exc}")
+        else:
+            logger.warning(
+                f"Stripe event {event_id} failed (attempt {attempts}), "
+                f"retrying in {self.retry_after(attempts).total_seconds():g}s: {exc}"
+            )
+
+
+stripe_event_worker = StripeEventWorker(
+    batch_size=settings.stripe_webhook_batch_size,
+    poll_interval=settings.stripe_webhook_poll_seconds,
+    max_attempts=settings.stripe_webhook_max_attempts,
+    retry_delay=settings.stripe_webhook_retry_seconds,
+    max_retry_delay=settings.stripe_webhook_retry_max_seconds,
+)
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import is_replica
+from app.models.user import User
+from app.models.subscription import Subscription
+from app.models.usage import UsageRecord
+from app.services.cache import TTLCache
+from app.services.plans import plan_catalogue
+from app.services.usage import billing_day
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    """A user's plan and today's usage, as needed by limit checks."""
+
+    day: date
+    plan: str
+    status: str
+    daily_limit: int
+    minutes_used: int
+    has_subscription: bool = False
+    current_period_start: Optional[datetime] = None
+    current_period_end: Optional[datetime] = None
+
+    @property
+    def minutes_remaining(self) -> int:
+        return max(0, self.daily_limit - self.minutes_used)
+
+    @property
+    def can_start(self) -> bool:
+        return self.minutes_remaining > 0
+
+
+entitlement_cache = TTLCache(
+    maxsize=settings.entitlement_cache_size,
+    ttl=settings.entitlement_cache_ttl_seconds,
+)
+
+
+async def get_entitlement(db: AsyncSession, user_id: str) -> Entitlement:
+    """Fetch plan, status and today's minutes in one round trip."""
+    today = billing_day()
+
+    cached = entitlement_cache.get(user_id)
+    if cached is not None and cached.day == today:
+        return cached
+
+    result = await db.execute(
+        select(
+            Subscription.id,
+            Subscription.plan,
+            Subscription.status,
+            Subscription.current_period_start,
+            Subscription.current_period_end,
+            UsageRecord.minutes_used,
+        )
+        .select_from(User)
+        .outerjoin(Subscription, Subscription.user_id == User.id)
+        .outerjoin(
+            UsageRecord,
+            and_(UsageRecord.user_id == User.id, UsageRecord.date == today),
+        )
+        .where(User.id == user_id)
+    )
+    row = result.first()
+
+    if row is None or row.id is None:
+        plan = "free"
+        entitlement = Entitlement(
+            day=today,
+            plan=plan,
+            status="active",
+            daily_limit=plan_catalogue.daily_limit(plan),
+            minutes_used=(row.minutes_used or 0) if row else 0,
+        )
+    else:
+        entitlement = Entitlement(
+            day=today,
+            plan=row.plan,
+            status=row.status,
+            daily_limit=plan_catalogue.daily_limit(row.plan),
+            minutes_used=row.minutes_used or 0,
+            has_subscription=True,
+            current_period_start=row.current_period_start,
+            current_period_end=row.current_period_end,
+        )
+
+    # A lagging replica could miss a just-recorded session; only cache
+    # what the primary (or a read-only handle on it) returned
+    if not is_replica(db):
+        entitlement_cache.set(user_id, entitlement)
+    return entitlement
+
+
+def invalidate_entitlement(user_id: str) -> None:
+    """Drop a cached entitlement after usage or subscription changes."""
+    entitlement_cache.pop(user_id)
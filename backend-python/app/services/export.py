@@ -0,0 +1,138 @@
+"""
+Streaming table exports (NDJSON or CSV, optionally gzipped).
+
+Rows are read through a server-side cursor in batches of
+``settings.export_batch_rows`` and encoded one batch at a time, so memory
+stays flat however many rows the export covers.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Literal, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from app.config import settings
+from app.database import read_session
+from app.models.session import PracticeSession
+from app.models.subscription import Subscription
+from app.models.usage import UsageRecord
+from app.models.user import User
+
+ExportFormat = Literal["ndjson", "csv"]
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Exported columns per table; password hashes are never exported
+EXPORT_COLUMNS = {
+    "users": (User.id, User.email, User.name, User.created_at),
+    "subscriptions": (
+        Subscription.user_id,
+        Subscription.plan,
+        Subscription.status,
+        Subscription.stripe_customer_id,
+        Subscription.stripe_subscription_id,
+        Subscription.current_period_start,
+        Subscription.current_period_end,
+        Subscription.created_at,
+        Subscription.updated_at,
+    ),
+    "practice_sessions": (
+        PracticeSession.id,
+        PracticeSession.user_id,
+        PracticeSession.mode,
+        PracticeSession.started_at,
+        PracticeSession.ended_at,
+        PracticeSession.duration_seconds,
+        PracticeSession.messages_count,
+        PracticeSession.feedback,
+    ),
+    "usage_records": (
+        UsageRecord.user_id,
+        UsageRecord.date,
+        UsageRecord.minutes_used,
+        UsageRecord.sessions_count,
+    ),
+}
+
+ExportTable = Literal["users", "subscriptions", "practice_sessions", "usage_records"]
+
+
+def export_query(table: ExportTable) -> tuple[Select, list[str]]:
+    """SELECT of a table's exported columns, with their names."""
+    columns = EXPORT_COLUMNS[table]
+    return select(*columns), [c.key for c in columns]
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(columns: Sequence[str], rows: Sequence[tuple]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, map(_plain, row))), separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _encode_csv(rows: Sequence[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(v) for v in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def _batches(statement: Select) -> AsyncIterator[Sequence[tuple]]:
+    # The body is sent after the route returns, so the export opens its own
+    # session instead of borrowing the request's; it holds one pooled
+    # connection until the download finishes or the client goes away
+    async with read_session() as db:
+        result = await db.stream(
+            statement.execution_options(yield_per=settings.export_batch_rows)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+
+async def export_chunks(
+    statement: Select,
+    columns: Sequence[str],
+    fmt: ExportFormat,
+    gzip: bool = False,
+) -> AsyncIterator[bytes]:
+    """Encoded (and compressed) chunks of ``statement``'s rows, one per batch."""
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if fmt == "csv":
+        yield emit(_encode_csv([columns]))
+    async for rows in _batches(statement):
+        chunk = emit(_encode_ndjson(columns, rows) if fmt == "ndjson" else _encode_csv(rows))
+        # compressobj buffers internally; skip empty chunks
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+def export_response(
+    statement: Select,
+    columns: Sequence[str],
+    fmt: ExportFormat,
+    gzip: bool,
+    filename: str,
+) -> StreamingResponse:
+    """Stream ``statement`` as a file download."""
+    filename = f"{filename}.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_chunks(statement, columns, fmt, gzip),
+        media_type="application/gzip" if gzip else _MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
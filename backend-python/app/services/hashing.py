@@ -0,0 +1,79 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.config import settings
+from app.metrics import Histogram
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so threads give real parallelism without
+    blocking the event loop. At most ``max_workers`` hashes run at once;
+    further callers wait on a semaphore, which is what ``queue_depth``
+    reports.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max(1, max_workers)
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.in_flight = 0
+        self.latency = Histogram()
+        self.wait_time = Histogram()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _ensure_started(self) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hash",
+            )
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` on the pool, queueing while all workers are busy."""
+        self._ensure_started()
+
+        queued_at = time.perf_counter()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        started_at = time.perf_counter()
+        self.wait_time.observe(started_at - queued_at)
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.latency.observe(time.perf_counter() - started_at)
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        """Stop the pool; it is recreated on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._slots = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "wait_seconds": self.wait_time.summary(),
+            "hash_seconds": self.latency.summary(),
+        }
+
+
+password_hasher = PasswordHasher(max_workers=settings.password_hash_workers)
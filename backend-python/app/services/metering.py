@@ -0,0 +1,161 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.session import PracticeSession
+from app.services.entitlements import get_entitlement, invalidate_entitlement
+from app.services.sessions import active_sessions, finish_session
+from app.services.usage import billing_day, reserve_minutes
+
+
+@dataclass
+class SessionMeter:
+    """Live usage of one open practice session."""
+
+    session_id: str
+    user_id: str
+    started_at: datetime
+    daily_limit: int
+    last_tick: datetime
+    used_seconds: float = 0.0
+    leased_seconds: int = 0
+    day_minutes_used: int = 0
+    limit_reached: bool = False
+    ended: bool = False
+
+    @property
+    def remaining_seconds(self) -> int:
+        """Unleased quota for the day plus what is left of this session's lease."""
+        unleased = max(0, self.daily_limit - self.day_minutes_used) * 60
+        return int(unleased + max(0.0, self.leased_seconds - self.used_seconds))
+
+    def as_message(self) -> dict:
+        return {
+            "type": "limit_reached" if self.limit_reached else "usage",
+            "session_id": self.session_id,
+            "used_seconds": int(self.used_seconds),
+            "remaining_seconds": self.remaining_seconds,
+            "ended": self.ended,
+        }
+
+
+class UsageMeter:
+    """
+    Meters live sessions from client heartbeats.
+
+    Elapsed time is counted in memory on every heartbeat. Quota is taken
+    from the day's usage row in leases of ``lease_minutes``: each lease is a
+    single conditional upsert that fails once the plan's daily limit would
+    be exceeded, so concurrent sessions (and workers) cannot overshoot it,
+    and the database sees one write per lease rather than one per
+    heartbeat. When a lease is refused the session is ended on the spot.
+    """
+
+    def __init__(self, lease_minutes: int, max_gap: float):
+        self.lease_minutes = max(1, lease_minutes)
+        self.max_gap = max_gap
+        self._meters: dict[str, SessionMeter] = {}
+
+    def __len__(self) -> int:
+        return len(self._meters)
+
+    async def _open(self, db: AsyncSession, session: PracticeSession) -> SessionMeter:
+        # Rebuilt from the row when this process has not metered the session
+        # yet (first heartbeat, restart, or a heartbeat on another worker)
+        entitlement = await get_entitlement(db, session.user_id)
+        last_tick = max(session.started_at, session.last_active_at or session.started_at)
+        leased_seconds = (session.metered_minutes or 0) * 60
+        return SessionMeter(
+            session_id=session.id,
+            user_id=session.user_id,
+            started_at=session.started_at,
+            daily_limit=entitlement.daily_limit,
+            last_tick=last_tick,
+            used_seconds=min(leased_seconds, (last_tick - session.started_at).total_seconds()),
+            leased_seconds=leased_seconds,
+            day_minutes_used=entitlement.minutes_used,
+        )
+
+    async def _lease(self, db: AsyncSession, meter: SessionMeter, now: datetime) -> bool:
+        """Reserve quota for the next stretch of the session."""
+        for minutes in dict.fromkeys((self.lease_minutes, 1)):
+            # Claim the minutes on the session first; this also fails if the
+            # session was ended meanwhile (by the client, reaper or a worker)
+            result = await db.execute(
+                update(PracticeSession)
+                .where(PracticeSession.id == meter.session_id, PracticeSession.ended_at.is_(None))
+                .values(
+                    metered_minutes=PracticeSession.metered_minutes + minutes,
+                    last_active_at=now,
+                )
+            )
+            if result.rowcount == 0:
+                meter.ended = True
+                return False
+
+            day_minutes_used = await reserve_minutes(
+                db, meter.user_id, billing_day(now), minutes, meter.daily_limit
+            )
+            if day_minutes_used is not None:
+                meter.leased_seconds += minutes * 60
+                meter.day_minutes_used = day_minutes_used
+                invalidate_entitlement(meter.user_id)
+                return True
+
+            await db.execute(
+                update(PracticeSession)
+                .where(PracticeSession.id == meter.session_id)
+                .values(metered_minutes=PracticeSession.metered_minutes - minutes)
+            )
+
+        # Refused even a single minute: the day's quota is used up
+        meter.day_minutes_used = meter.daily_limit
+        return False
+
+    async def heartbeat(self, db: AsyncSession, session: PracticeSession) -> SessionMeter:
+        """
+        Account for time since the last heartbeat; the caller commits.
+
+        Silences longer than ``max_gap`` (a backgrounded tab, a dropped
+        socket) only count up to ``max_gap``.
+        """
+        meter = self._meters.get(session.id)
+        if meter is None:
+            meter = await self._open(db, session)
+            self._meters[session.id] = meter
+
+        now = datetime.utcnow()
+        elapsed = (now - meter.last_tick).total_seconds()
+        meter.used_seconds += min(max(0.0, elapsed), self.max_gap)
+        meter.last_tick = now
+
+        while not meter.ended and meter.used_seconds >= meter.leased_seconds:
+            if not await self._lease(db, meter, now):
+                meter.limit_reached = not meter.ended
+                break
+
+        if meter.limit_reached:
+            await finish_session(db, session, ended_at=now)
+            meter.ended = True
+        if meter.ended:
+            self.close(session.id)
+            active_sessions.remove(session.user_id, session.id)
+            invalidate_entitlement(session.user_id)
+        return meter
+
+    def close(self, session_id: str) -> Optional[SessionMeter]:
+        """Stop metering a session (it ended)."""
+        meter = self._meters.pop(session_id, None)
+        if meter is not None:
+            meter.ended = True
+        return meter
+
+
+usage_meter = UsageMeter(
+    lease_minutes=settings.metering_lease_minutes,
+    max_gap=settings.metering_max_gap_seconds,
+)
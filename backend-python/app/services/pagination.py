@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import HTTPException, status
+
+# Server-side cap for any keyset-paginated listing
+MAX_PAGE_SIZE = 100
+
+
+def clamp_page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque cursor for the last row of a page (its sort key)."""
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Decode a cursor back into typed sort-key values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(types):
+            raise ValueError("cursor arity")
+        return tuple(
+            t.fromisoformat(v) if t in (date, datetime) else t(v)
+            for t, v in zip(types, values)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
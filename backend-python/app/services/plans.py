@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session, dialect_insert
+from app.models.subscription import PlanLimit, PLAN_LIMITS
+
+
+@dataclass(frozen=True)
+class CatalogueSnapshot:
+    """An immutable view of plan_limits plus its serialized response."""
+
+    plans: tuple[dict, ...]
+    daily_minutes: dict[str, int]
+    body: bytes
+    etag: str
+
+    @classmethod
+    def build(cls, plans: list[dict]) -> "CatalogueSnapshot":
+        body = json.dumps(plans, separators=(",", ":")).encode()
+        return cls(
+            plans=tuple(plans),
+            daily_minutes={p["plan"]: p["daily_minutes"] for p in plans},
+            body=body,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        )
+
+
+def _default_plans() -> list[dict]:
+    return [{"plan": plan, **limits} for plan, limits in PLAN_LIMITS.items()]
+
+
+class PlanCatalogue:
+    """
+    In-process plan catalogue backed by the ``plan_limits`` table.
+
+    The table is seeded from ``PLAN_LIMITS`` on first boot. Readers get a
+    snapshot that is swapped atomically; a background task re-reads the
+    (tiny) table every ``refresh_interval`` seconds and swaps in a new
+    snapshot only when the rows changed.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self.reloads = 0
+        self._snapshot = CatalogueSnapshot.build(_default_plans())
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> CatalogueSnapshot:
+        return self._snapshot
+
+    def daily_limit(self, plan: str) -> int:
+        """Daily minutes allowed on a plan, falling back to free."""
+        daily_minutes = self._snapshot.daily_minutes
+        if plan in daily_minutes:
+            return daily_minutes[plan]
+        return daily_minutes.get("free", PLAN_LIMITS["free"]["daily_minutes"])
+
+    def etag_matches(self, if_none_match: Optional[str]) -> bool:
+        """Weak comparison against an If-None-Match header value."""
+        if not if_none_match:
+            return False
+        etag = self._snapshot.etag
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*" or candidate.removeprefix("W/") == etag:
+                return True
+        return False
+
+    async def seed(self) -> None:
+        """Insert any PLAN_LIMITS rows missing from plan_limits."""
+        async with async_session() as session:
+            insert = dialect_insert(session)
+            await session.execute(
+                insert(PlanLimit).on_conflict_do_nothing(),
+                _default_plans(),
+            )
+            await session.commit()
+
+    async def reload(self) -> bool:
+        """Re-read plan_limits; returns True if the catalogue changed."""
+        async with async_session() as session:
+            result = await session.execute(
+                select(PlanLimit).order_by(PlanLimit.monthly_price_aud, PlanLimit.plan)
+            )
+            plans = [
+                {
+                    "plan": row.plan,
+                    "daily_minutes": row.daily_minutes,
+                    "monthly_price_aud": row.monthly_price_aud,
+                }
+                for row in result.scalars()
+            ]
+
+        if not plans:
+            return False
+
+        snapshot = CatalogueSnapshot.build(plans)
+        if snapshot.etag == self._snapshot.etag:
+            return False
+
+        self._snapshot = snapshot
+        self.reloads += 1
+        self._on_change()
+        return True
+
+    def _on_change(self) -> None:
+        # Cached entitlements carry a daily limit from the old catalogue
+        from app.services.entitlements import entitlement_cache
+
+        entitlement_cache.clear()
+        logger.info(f"Plan catalogue reloaded ({len(self._snapshot.plans)} plans)")
+
+    async def start(self) -> None:
+        """Seed, load and begin watching plan_limits for changes."""
+        await self.seed()
+        await self.reload()
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._watch(), name="plan-catalogue")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Plan catalogue reload failed; keeping previous snapshot")
+
+
+plan_catalogue = PlanCatalogue(refresh_interval=settings.plan_catalogue_refresh_seconds)
@@ -0,0 +1,69 @@
+import hashlib
+import time
+from typing import Optional
+
+from app.config import settings
+from app.models.user import User
+from app.services.cache import TTLCache
+
+
+class PrincipalCache:
+    """
+    Fast path for authenticated requests.
+
+    Decoded tokens are cached by a digest of the raw token (never the token
+    itself), and User rows are cached by id, so a warm request needs neither
+    a JWT decode nor a database round trip.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, user_ttl: Optional[float] = None):
+        self.tokens = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.users = TTLCache(maxsize=maxsize, ttl=ttl if user_ttl is None else user_ttl)
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_user_id(self, token: str) -> Optional[str]:
+        """Return the subject of a previously decoded token."""
+        return self.tokens.get(self.digest(token))
+
+    def set_user_id(self, token: str, user_id: str, expires_at: Optional[float]) -> None:
+        """Remember a decoded token, never beyond its own expiry."""
+        ttl = None
+        if expires_at is not None:
+            ttl = expires_at - time.time()
+        self.tokens.set(self.digest(token), user_id, ttl=ttl)
+
+    def get_user(self, user_id: str) -> Optional[User]:
+        return self.users.get(user_id)
+
+    def set_user(self, user: User) -> None:
+        self.users.set(user.id, user)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop a cached User row after it has been modified."""
+        self.users.pop(user_id)
+
+    def clear(self) -> None:
+        self.tokens.clear()
+        self.users.clear()
+
+    def stats(self) -> dict:
+        return {
+            "tokens": self.tokens.stats(),
+            "users": self.users.stats(),
+        }
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+    # invalidate_user() only reaches this process; with several workers,
+    # bound how long the others may serve a stale row after an update
+    user_ttl=(
+        settings.principal_cache_ttl_seconds
+        if settings.worker_count() == 1
+        else min(settings.principal_cache_ttl_seconds, settings.entitlement_cache_ttl_seconds)
+    ),
+)
@@ -0,0 +1,302 @@
+"""
+Admin usage reporting, served from the usage_daily aggregate.
+
+Minutes are billed minutes, the ones counted against the daily quota:
+each session contributes its ``metered_minutes`` (live leases plus the
+remainder billed when it ended), on the day it ended. usage_records is
+kept per day of billing instead, so a session that ran across midnight
+can split differently between the two, but the totals agree.
+
+``record_daily_usage`` is called from session accounting; the nightly
+compaction recomputes recent days from practice_sessions so any drift
+(sessions closed across midnight, crashes between writes) is corrected.
+Compact by hand with:
+
+    python -m app.services.reporting compact [days]
+"""
+
+import asyncio
+import sys
+from datetime import date, timedelta
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session, dialect_insert
+from app.models.reporting import ALL_MODES, UsageDaily
+from app.models.session import PracticeSession
+from app.models.stats import UserStats
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.services.archive import archive_cutoff, first_unarchived_day
+from app.services.cache import TTLCache
+from app.services.schedule import DailyJob
+from app.services.usage import billing_day, day_start
+
+# User and subscription head counts are whole-table aggregates; refresh them
+# at most this often rather than on every report request
+_population_cache = TTLCache(maxsize=1, ttl=60.0)
+
+
+async def record_daily_usage(
+    db: AsyncSession,
+    day: date,
+    plan: str,
+    mode: str,
+    minutes: int,
+    first_session_today: bool,
+    sessions: int = 1,
+) -> None:
+    """Count one billed session in the (day, plan, mode) and plan-total rows."""
+    insert = dialect_insert(db)
+    rows = [
+        {"date": day, "plan": plan, "mode": mode, "sessions": sessions, "minutes": minutes, "active_users": 0},
+        {
+            "date": day,
+            "plan": plan,
+            "mode": ALL_MODES,
+            "sessions": sessions,
+            "minutes": minutes,
+            "active_users": int(first_session_today),
+        },
+    ]
+    stmt = insert(UsageDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UsageDaily.date, UsageDaily.plan, UsageDaily.mode],
+        set_={
+            "sessions": UsageDaily.sessions + stmt.excluded.sessions,
+            "minutes": UsageDaily.minutes + stmt.excluded.minutes,
+            "active_users": UsageDaily.active_users + stmt.excluded.active_users,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt, rows)
+
+
+async def compact_daily_usage(db: AsyncSession, start: date, end: date) -> int:
+    """
+    Recompute usage_daily for ``start <= date < end`` from practice_sessions.
+
+    Sessions count on the local day they ended (``billing_day``), the day
+    ``finish_session`` recorded them on. SQL cannot work that out portably,
+    so the window's sessions are streamed and grouped here. Plans are taken
+    from the users' current subscriptions, which for the last day or two is
+    what they were on when the sessions ran.
+
+    Archived days are left alone: their sessions have been rolled up into
+    monthly_summaries, and their aggregates are all that is left of them.
+    That covers months already archived (including by a manual run with a
+    shorter retention) and those the nightly job is about to archive.
+    """
+    if settings.archive_retention_days > 0:
+        start = max(start, archive_cutoff(billing_day(), settings.archive_retention_days))
+    archived_until = await first_unarchived_day(db)
+    if archived_until is not None:
+        start = max(start, archived_until)
+    if start >= end:
+        return 0
+
+    result = await db.stream(
+        select(
+            PracticeSession.ended_at,
+            func.coalesce(Subscription.plan, "free"),
+            PracticeSession.mode,
+            PracticeSession.user_id,
+            PracticeSession.metered_minutes,
+        )
+        .select_from(PracticeSession)
+        .outerjoin(Subscription, Subscription.user_id == PracticeSession.user_id)
+        .where(
+            PracticeSession.ended_at.is_not(None),
+            PracticeSession.ended_at >= day_start(start),
+            PracticeSession.ended_at < day_start(end),
+        )
+    )
+
+    rows: dict[tuple, dict] = {}
+    active: dict[tuple, set] = {}
+    async for ended_at, plan, mode, user_id, minutes in result:
+        day = billing_day(ended_at)
+        for key in ((day, plan, mode), (day, plan, ALL_MODES)):
+            row = rows.setdefault(key, {
+                "date": day, "plan": plan, "mode": key[2], "sessions": 0, "minutes": 0, "active_users": 0,
+            })
+            row["sessions"] += 1
+            row["minutes"] += minutes
+        active.setdefault((day, plan), set()).add(user_id)
+    for (day, plan), user_ids in active.items():
+        rows[(day, plan, ALL_MODES)]["active_users"] = len(user_ids)
+
+    await db.execute(delete(UsageDaily).where(UsageDaily.date >= start, UsageDaily.date < end))
+    if rows:
+        await db.execute(UsageDaily.__table__.insert(), list(rows.values()))
+    return len(rows)
+
+
+async def _population(db: AsyncSession) -> dict:
+    cached = _population_cache.get("population")
+    if cached is not None:
+        return cached
+
+    total_users = (await db.execute(select(func.count()).select_from(User))).scalar_one()
+    plans = await db.execute(
+        select(Subscription.plan, func.count())
+        .where(Subscription.status == "active")
+        .group_by(Subscription.plan)
+    )
+    population = {"total_users": total_users, "subscriptions": dict(plans.all())}
+    _population_cache.set("population", population)
+    return population
+
+
+def _totals(rows) -> dict:
+    return {
+        "active_users": sum(r.active_users for r in rows if r.mode == ALL_MODES),
+        "total_sessions": sum(r.sessions for r in rows if r.mode == ALL_MODES),
+        "total_minutes": sum(r.minutes for r in rows if r.mode == ALL_MODES),
+    }
+
+
+def _breakdown(rows, key: str) -> dict:
+    """Sessions and minutes grouped by plan or mode."""
+    out: dict[str, dict] = {}
+    for r in rows:
+        if (key == "plan") != (r.mode == ALL_MODES):
+            continue
+        entry = out.setdefault(getattr(r, key), {"sessions": 0, "minutes": 0})
+        entry["sessions"] += r.sessions
+        entry["minutes"] += r.minutes
+    return out
+
+
+async def usage_summary(db: AsyncSession, today: date) -> dict:
+    """Today and month-to-date totals, by plan and by mode."""
+    month_start = today.replace(day=1)
+    result = await db.execute(
+        select(UsageDaily).where(UsageDaily.date >= month_start, UsageDaily.date <= today)
+    )
+    rows = result.scalars().all()
+    today_rows = [r for r in rows if r.date == today]
+
+    return {
+        **await _population(db),
+        "today": {
+            "date": today,
+            **_totals(today_rows),
+            "by_plan": _breakdown(today_rows, "plan"),
+            "by_mode": _breakdown(today_rows, "mode"),
+        },
+        "this_month": {
+            "start_date": month_start,
+            # Users active on several days are counted once per day
+            **_totals(rows),
+            "by_plan": _breakdown(rows, "plan"),
+            "by_mode": _breakdown(rows, "mode"),
+        },
+    }
+
+
+async def usage_daily(db: AsyncSession, today: date, days: int) -> list[dict]:
+    """Per-day totals for the last ``days`` days, newest first."""
+    result = await db.execute(
+        select(UsageDaily)
+        .where(UsageDaily.date > today - timedelta(days=days), UsageDaily.date <= today)
+        .order_by(UsageDaily.date.desc())
+    )
+    by_day: dict[date, list] = {}
+    for row in result.scalars():
+        by_day.setdefault(row.date, []).append(row)
+
+    return [
+        {
+            "date": day,
+            **_totals(rows),
+            "by_plan": _breakdown(rows, "plan"),
+            "by_mode": _breakdown(rows, "mode"),
+        }
+        for day, rows in by_day.items()
+    ]
+
+
+async def top_users(db: AsyncSession, limit: int) -> list[dict]:
+    """Users with the most billed minutes, read off the user_stats index."""
+    sessions = UserStats.everyday_sessions + UserStats.slang_sessions + UserStats.workplace_sessions
+    result = await db.execute(
+        select(
+            UserStats.user_id,
+            User.email,
+            Subscription.plan,
+            UserStats.total_minutes,
+            sessions.label("total_sessions"),
+        )
+        .join(User, User.id == UserStats.user_id)
+        .outerjoin(Subscription, Subscription.user_id == UserStats.user_id)
+        .order_by(UserStats.total_minutes.desc())
+        .limit(limit)
+    )
+    return [
+        {
+            "id": row.user_id,
+            "email": row.email,
+            "plan": row.plan or "free",
+            "total_minutes": row.total_minutes,
+            "total_sessions": row.total_sessions,
+        }
+        for row in result
+    ]
+
+
+class UsageCompactor(DailyJob):
+    """Recomputes the last ``days`` complete days of usage_daily every night."""
+
+    name = "usage-compactor"
+
+    def __init__(self, hour: int, days: int):
+        super().__init__(hour)
+        self.days = days
+
+    @property
+    def enabled(self) -> bool:
+        return self.days > 0
+
+    async def run(self) -> None:
+        await self.compact()
+
+    async def compact(self, today: Optional[date] = None) -> int:
+        """Recompute the ``days`` days before ``today``."""
+        today = today or billing_day()
+        async with async_session() as db:
+            rows = await compact_daily_usage(db, today - timedelta(days=self.days), today)
+            await db.commit()
+        logger.info(f"Compacted usage_daily for the last {self.days} day(s): {rows} rows")
+        return rows
+
+
+usage_compactor = UsageCompactor(
+    hour=settings.usage_compaction_hour_utc,
+    days=settings.usage_compaction_days,
+)
+
+
+async def _main(argv: list[str]) -> int:
+    from app.database import engine, init_db
+
+    if not argv or argv[0] != "compact":
+        print("Usage: python -m app.services.reporting compact [days]")
+        return 2
+
+    # Tomorrow as the exclusive end, so a manual run also rebuilds today
+    compactor = UsageCompactor(hour=0, days=int(argv[1]) if len(argv) > 1 else settings.usage_compaction_days)
+    try:
+        await init_db(force=True)
+        await compactor.compact(today=billing_day() + timedelta(days=1))
+        return 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,128 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.analytics import EventRecord, EventRollup, EventRollupSession
+
+GRANULARITIES = ("hour", "day")
+ALL_EVENTS = "*"
+
+# Rows per multi-row INSERT, well under SQLite's bound-parameter limit
+_CHUNK = 1000
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its hour or day."""
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        ts = ts.replace(hour=0)
+    return ts
+
+
+async def _distinct_sessions(session: AsyncSession, granularity: str, name: str, bucket: datetime) -> int:
+    """Distinct sessions in a bucket, counted from the raw events."""
+    span = timedelta(days=1) if granularity == "day" else timedelta(hours=1)
+    query = select(func.count(EventRecord.session_id.distinct())).where(
+        EventRecord.occurred_at >= bucket,
+        EventRecord.occurred_at < bucket + span,
+    )
+    if name != ALL_EVENTS:
+        query = query.where(EventRecord.name == name)
+    return (await session.execute(query)).scalar_one()
+
+
+async def _upsert_rollups(session: AsyncSession, rows: list[dict], recounted: bool) -> None:
+    insert = dialect_insert(session)
+    stmt = insert(EventRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EventRollup.granularity, EventRollup.name, EventRollup.bucket_start],
+        set_={
+            "event_count": EventRollup.event_count + stmt.excluded.event_count,
+            "session_count": (
+                stmt.excluded.session_count if recounted
+                else EventRollup.session_count + stmt.excluded.session_count
+            ),
+        },
+    )
+    await session.execute(stmt, rows)
+
+
+async def apply_rollups(
+    session: AsyncSession,
+    rows: list[dict],
+    retention: timedelta = timedelta(hours=48),
+) -> None:
+    """
+    Fold a batch of raw events into the hourly and daily rollups.
+
+    Runs in the same transaction as the raw insert. Distinct sessions are
+    tracked by inserting (bucket, name, session) membership rows with
+    ON CONFLICT DO NOTHING; only rows that were actually new come back from
+    RETURNING and bump ``session_count``. Membership is only kept for
+    ``retention`` (see ``prune_rollup_sessions``), so late events for older
+    buckets get their bucket's session count recounted from the raw events
+    instead, rather than counting sessions a second time.
+    """
+    cutoff = datetime.utcnow() - retention
+    events = Counter()
+    members = set()
+    late = set()
+    for row in rows:
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(row["occurred_at"], granularity)
+            for name in (row["name"], ALL_EVENTS):
+                events[(granularity, name, bucket)] += 1
+                if bucket < cutoff:
+                    late.add((granularity, name, bucket))
+                else:
+                    members.add((granularity, name, bucket, row["session_id"]))
+
+    insert = dialect_insert(session)
+
+    new_sessions = Counter()
+    members = [
+        {"granularity": g, "name": n, "bucket_start": b, "session_id": s}
+        for g, n, b, s in members
+    ]
+    for i in range(0, len(members), _CHUNK):
+        stmt = (
+            insert(EventRollupSession)
+            .values(members[i:i + _CHUNK])
+            .on_conflict_do_nothing()
+            .returning(
+                EventRollupSession.granularity,
+                EventRollupSession.name,
+                EventRollupSession.bucket_start,
+            )
+        )
+        for granularity, name, bucket in await session.execute(stmt):
+            new_sessions[(granularity, name, bucket)] += 1
+    for key in late:
+        new_sessions[key] = await _distinct_sessions(session, *key)
+
+    for recounted in (False, True):
+        batch = [
+            {
+                "granularity": granularity,
+                "name": name,
+                "bucket_start": bucket,
+                "event_count": count,
+                "session_count": new_sessions[(granularity, name, bucket)],
+            }
+            for (granularity, name, bucket), count in events.items()
+            if ((granularity, name, bucket) in late) == recounted
+        ]
+        if batch:
+            await _upsert_rollups(session, batch, recounted)
+
+
+async def prune_rollup_sessions(session: AsyncSession, retention: timedelta) -> int:
+    """Forget session membership for buckets that can no longer change."""
+    cutoff = datetime.utcnow() - retention
+    result = await session.execute(
+        delete(EventRollupSession).where(EventRollupSession.bucket_start < cutoff)
+    )
+    return result.rowcount
@@ -0,0 +1,58 @@
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+
+
+class DailyJob(ABC):
+    """
+    Background task that calls ``run()`` once a day at ``hour`` UTC.
+
+    Subclasses implement ``run()`` and may override ``enabled``. A failed
+    run is logged and retried at the next scheduled time.
+    """
+
+    name = "daily-job"
+
+    def __init__(self, hour: int):
+        self.hour = hour
+        self.runs = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    def start(self) -> None:
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def seconds_until_next_run(self, now: datetime) -> float:
+        next_run = now.replace(hour=self.hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.seconds_until_next_run(datetime.utcnow()))
+            try:
+                await self.run()
+                self.runs += 1
+            except Exception:
+                logger.exception(f"Scheduled job {self.name} failed")
+
+    @abstractmethod
+    async def run(self) -> None:
+        """The day's work; exceptions are logged by the scheduler."""
@@ -0,0 +1,338 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.session import PracticeSession
+from app.services.entitlements import get_entitlement, invalidate_entitlement
+from app.services.reporting import record_daily_usage
+from app.services.stats import record_session_stats
+from app.services.usage import billing_day, record_usage, reserve_up_to, session_minutes
+
+
+@dataclass(frozen=True)
+class ActiveSession:
+    """The open practice session of a user, as served by /sessions/active."""
+
+    id: str
+    user_id: str
+    mode: str
+    started_at: datetime
+    messages_count: int = 0
+
+    @classmethod
+    def from_row(cls, session: PracticeSession) -> "ActiveSession":
+        return cls(
+            id=session.id,
+            user_id=session.user_id,
+            mode=session.mode,
+            started_at=session.started_at,
+            messages_count=session.messages_count,
+        )
+
+
+async def finish_session(
+    db: AsyncSession,
+    session: PracticeSession,
+    ended_at: Optional[datetime] = None,
+    **values,
+) -> bool:
+    """
+    Close a session, bill its minutes to the usage of the day it ended and
+    update the user's progress stats and the daily reporting aggregates.
+
+    The UPDATE only matches while ``ended_at`` is still NULL, so a session
+    ended by the client and by the reaper at the same time is billed once.
+    Minutes already billed by live metering are not billed again, and the
+    rest is capped at what is left of the plan's daily allowance, so ending
+    a session cannot overshoot the limit the live leases enforce. The
+    session's ``metered_minutes`` ends up holding everything billed for it.
+    Returns False if the session had already ended.
+    """
+    ended_at = ended_at or datetime.utcnow()
+    duration_seconds = max(0, int((ended_at - session.started_at).total_seconds()))
+
+    result = await db.execute(
+        update(PracticeSession)
+        .where(PracticeSession.id == session.id, PracticeSession.ended_at.is_(None))
+        .values(ended_at=ended_at, duration_seconds=duration_seconds, **values)
+        .returning(PracticeSession.metered_minutes)
+    )
+    metered_minutes = result.scalar_one_or_none()
+    if metered_minutes is None:
+        return False
+
+    day = billing_day(ended_at)
+    minutes = session_minutes(duration_seconds)
+    entitlement = await get_entitlement(db, session.user_id)
+    billed = await reserve_up_to(
+        db,
+        user_id=session.user_id,
+        day=day,
+        minutes=max(0, minutes - metered_minutes),
+        daily_limit=entitlement.daily_limit,
+    )
+    billed_minutes = metered_minutes + billed
+    if billed:
+        await db.execute(
+            update(PracticeSession)
+            .where(PracticeSession.id == session.id)
+            .values(metered_minutes=billed_minutes)
+        )
+    usage = await record_usage(db, user_id=session.user_id, day=day, minutes=0)
+    await record_session_stats(
+        db,
+        user_id=session.user_id,
+        mode=session.mode,
+        duration_seconds=duration_seconds,
+        minutes=billed_minutes,
+        feedback=values.get("feedback"),
+        day=day,
+    )
+    await record_daily_usage(
+        db,
+        day=day,
+        plan=entitlement.plan,
+        mode=session.mode,
+        minutes=billed_minutes,
+        first_session_today=usage.sessions_count == 1,
+    )
+    return True
+
+
+async def correct_reaped_session(
+    db: AsyncSession,
+    session: PracticeSession,
+    ended_at: Optional[datetime] = None,
+    **values,
+) -> bool:
+    """
+    Re-close a session the reaper closed, at the time the client ended it.
+
+    A client that never heartbeats leaves the reaper nothing but the
+    session's start to close it at, so its end, if it still arrives, is
+    taken as the truth: the duration is corrected and any extra minutes are
+    billed, capped like in ``finish_session``. Metered sessions are left
+    alone; their billing already follows their heartbeats. ``session`` must
+    have been loaded after the reaper closed it. Applies once per session;
+    returns False if there was nothing to correct.
+    """
+    if session.reaped_at is None or session.last_active_at is not None or session.duration_seconds is None:
+        return False
+    previous_seconds = session.duration_seconds
+    ended_at = ended_at or datetime.utcnow()
+    duration_seconds = max(0, int((ended_at - session.started_at).total_seconds()))
+
+    result = await db.execute(
+        update(PracticeSession)
+        .where(
+            PracticeSession.id == session.id,
+            PracticeSession.reaped_at.is_not(None),
+            PracticeSession.last_active_at.is_(None),
+        )
+        .values(ended_at=ended_at, duration_seconds=duration_seconds, reaped_at=None, **values)
+        .returning(PracticeSession.metered_minutes)
+    )
+    metered_minutes = result.scalar_one_or_none()
+    if metered_minutes is None:
+        return False
+
+    day = billing_day(ended_at)
+    entitlement = await get_entitlement(db, session.user_id)
+    billed = await reserve_up_to(
+        db,
+        user_id=session.user_id,
+        day=day,
+        minutes=max(0, session_minutes(duration_seconds) - metered_minutes),
+        daily_limit=entitlement.daily_limit,
+    )
+    if billed:
+        await db.execute(
+            update(PracticeSession)
+            .where(PracticeSession.id == session.id)
+            .values(metered_minutes=metered_minutes + billed)
+        )
+    await record_session_stats(
+        db,
+        user_id=session.user_id,
+        mode=session.mode,
+        duration_seconds=duration_seconds - previous_seconds,
+        minutes=billed,
+        feedback=values.get("feedback"),
+        day=day,
+        sessions=0,
+    )
+    await record_daily_usage(
+        db,
+        day=day,
+        plan=entitlement.plan,
+        mode=session.mode,
+        minutes=billed,
+        first_session_today=False,
+        sessions=0,
+    )
+    return True
+
+
+class ActiveSessionRegistry:
+    """
+    In-memory map of user id -> open sessions by id, backed by practice_sessions.
+
+    Loaded from the database at startup and kept current by start/end and
+    the reaper, so /sessions/active is a dict lookup. Every open session is
+    tracked, not just the newest, so ending one of two (two tabs) leaves
+    the other active. Only a single worker sees every start and end; with
+    several workers the registry is not authoritative and lookups go to
+    the (indexed) table instead.
+    """
+
+    def __init__(self, authoritative: bool):
+        self.authoritative = authoritative
+        self._by_user: dict[str, dict[str, ActiveSession]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(sessions) for sessions in self._by_user.values())
+
+    async def load(self) -> None:
+        """Populate from the open sessions in the database."""
+        if not self.authoritative:
+            return
+        async with async_session() as db:
+            result = await db.execute(
+                select(PracticeSession)
+                .where(PracticeSession.ended_at.is_(None))
+                .order_by(PracticeSession.started_at)
+            )
+            self._by_user = {}
+            for session in result.scalars():
+                self.add(session)
+
+    async def lookup(self, db: AsyncSession, user_id: str) -> Optional[ActiveSession]:
+        """The user's newest open session, if any."""
+        if self.authoritative:
+            sessions = self._by_user.get(user_id)
+            # Later starts were added later; reversed, so they also win ties
+            return max(reversed(sessions.values()), key=lambda s: s.started_at) if sessions else None
+
+        result = await db.execute(
+            select(PracticeSession)
+            .where(
+                PracticeSession.user_id == user_id,
+                PracticeSession.ended_at.is_(None),
+            )
+            .order_by(PracticeSession.started_at.desc())
+            .limit(1)
+        )
+        session = result.scalar_one_or_none()
+        return ActiveSession.from_row(session) if session else None
+
+    def add(self, session: PracticeSession) -> None:
+        self._by_user.setdefault(session.user_id, {})[session.id] = ActiveSession.from_row(session)
+
+    def remove(self, user_id: str, session_id: str) -> None:
+        """Forget a session once it has ended."""
+        sessions = self._by_user.get(user_id)
+        if sessions is not None:
+            sessions.pop(session_id, None)
+            if not sessions:
+                del self._by_user[user_id]
+
+
+class SessionReaper:
+    """
+    Background task that closes sessions the client never ended.
+
+    A metered session is abandoned once no heartbeat has arrived for
+    ``idle_timeout`` and is closed at its last heartbeat. Clients that never
+    heartbeat leave no trace of activity, so their sessions are only reaped
+    after ``unmetered_timeout`` and closed at their start. Either way the
+    session is billed through ``finish_session`` and marked ``reaped_at``;
+    if the end of a session that never heartbeated still arrives,
+    ``correct_reaped_session`` bills its real duration.
+    """
+
+    def __init__(
+        self,
+        registry: ActiveSessionRegistry,
+        idle_timeout: timedelta,
+        unmetered_timeout: timedelta,
+        interval: float,
+    ):
+        self.registry = registry
+        self.idle_timeout = idle_timeout
+        self.unmetered_timeout = unmetered_timeout
+        self.interval = interval
+        self.reaped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run(), name="session-reaper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.reap()
+            except Exception:
+                logger.exception("Session reaper pass failed")
+            await asyncio.sleep(self.interval)
+
+    async def reap(self, now: Optional[datetime] = None) -> int:
+        """Close every abandoned session; returns how many were closed."""
+        now = now or datetime.utcnow()
+        last_active_at = PracticeSession.last_active_at
+        idle = or_(
+            and_(last_active_at.is_not(None), last_active_at < now - self.idle_timeout),
+            and_(last_active_at.is_(None), PracticeSession.started_at < now - self.unmetered_timeout),
+        )
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(PracticeSession)
+                .where(PracticeSession.ended_at.is_(None), idle)
+                .limit(500)
+            )
+            closed = []
+            for session in result.scalars():
+                ended_at = session.last_active_at or session.started_at
+                if await finish_session(db, session, ended_at=ended_at, reaped_at=now):
+                    closed.append(session)
+            await db.commit()
+
+        # Metering builds on this module; import late to avoid the cycle
+        from app.services.metering import usage_meter
+
+        for session in closed:
+            usage_meter.close(session.id)
+            self.registry.remove(session.user_id, session.id)
+            invalidate_entitlement(session.user_id)
+
+        if closed:
+            self.reaped += len(closed)
+            logger.info(f"Reaped {len(closed)} abandoned practice session(s)")
+        return len(closed)
+
+
+active_sessions = ActiveSessionRegistry(authoritative=settings.worker_count() == 1)
+
+session_reaper = SessionReaper(
+    active_sessions,
+    idle_timeout=timedelta(minutes=settings.session_idle_timeout_minutes),
+    unmetered_timeout=timedelta(minutes=settings.session_unmetered_timeout_minutes),
+    interval=settings.session_reap_interval_seconds,
+)
@@ -0,0 +1,237 @@
+"""
+Per-user progress statistics (user_stats).
+
+``record_session_stats`` folds one finished session into the user's row
+with a single upsert; ``finish_session`` calls it, so stats stay current
+without ever rescanning practice_sessions. Rebuild from history with:
+
+    python -m app.services.stats backfill
+"""
+
+import asyncio
+import sys
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.archive import MonthlySummary
+from app.models.reporting import ALL_MODES
+from app.models.session import PracticeSession, PRACTICE_MODES
+from app.models.stats import UserStats
+from app.services.usage import billing_day
+
+
+def _counter_columns(mode: str) -> tuple[str, str]:
+    if mode not in PRACTICE_MODES:
+        mode = "everyday"
+    return f"{mode}_sessions", f"{mode}_seconds"
+
+
+async def record_session_stats(
+    db: AsyncSession,
+    user_id: str,
+    mode: str,
+    duration_seconds: int,
+    minutes: int,
+    feedback: Optional[bool],
+    day: date,
+    sessions: int = 1,
+) -> None:
+    """
+    Add a finished session to the user's counters and streak.
+
+    With ``sessions=0`` only the time, minutes and feedback are added, for
+    a correction to a session already counted.
+    """
+    sessions_column, seconds_column = _counter_columns(mode)
+
+    counters = {name: 0 for m in PRACTICE_MODES for name in _counter_columns(m)}
+    counters.update({sessions_column: sessions, seconds_column: duration_seconds})
+
+    insert = dialect_insert(db)
+    stmt = insert(UserStats).values(
+        user_id=user_id,
+        **counters,
+        total_minutes=minutes,
+        feedback_positive=int(feedback is True),
+        feedback_total=int(feedback is not None),
+        current_streak=1,
+        longest_streak=1,
+        last_practice_date=day,
+    )
+
+    # SET expressions all see the row as it was before this update
+    last = UserStats.last_practice_date
+    current_streak = case(
+        (last.is_(None), 1),
+        (last >= day, UserStats.current_streak),
+        (last == day - timedelta(days=1), UserStats.current_streak + 1),
+        else_=1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={
+            sessions_column: getattr(UserStats, sessions_column) + sessions,
+            seconds_column: getattr(UserStats, seconds_column) + duration_seconds,
+            "total_minutes": UserStats.total_minutes + minutes,
+            "feedback_positive": UserStats.feedback_positive + stmt.excluded.feedback_positive,
+            "feedback_total": UserStats.feedback_total + stmt.excluded.feedback_total,
+            "current_streak": current_streak,
+            "longest_streak": case(
+                (current_streak > UserStats.longest_streak, current_streak),
+                else_=UserStats.longest_streak,
+            ),
+            "last_practice_date": case(
+                (last.is_(None), day),
+                (last > day, last),
+                else_=day,
+            ),
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+
+def summarize(stats: Optional[UserStats], today: date) -> dict:
+    """API view of a user_stats row; streaks lapse after a missed day."""
+    modes = {
+        mode: {
+            "sessions": getattr(stats, f"{mode}_sessions") if stats else 0,
+            "minutes": (getattr(stats, f"{mode}_seconds") if stats else 0) // 60,
+        }
+        for mode in PRACTICE_MODES
+    }
+
+    current_streak = 0
+    if stats and stats.last_practice_date and stats.last_practice_date >= today - timedelta(days=1):
+        current_streak = stats.current_streak
+
+    feedback_total = stats.feedback_total if stats else 0
+    return {
+        "total_sessions": sum(m["sessions"] for m in modes.values()),
+        # Billed minutes, as stored; the per-mode figures are practice time
+        "total_minutes": stats.total_minutes if stats else 0,
+        "modes": modes,
+        "positive_feedback_ratio": (
+            round(stats.feedback_positive / feedback_total, 3) if feedback_total else None
+        ),
+        "current_streak": current_streak,
+        "longest_streak": stats.longest_streak if stats else 0,
+        "last_practice_date": stats.last_practice_date if stats else None,
+    }
+
+
+def _streaks(days: list[date]) -> tuple[int, int]:
+    """(current, longest) runs of consecutive days in an ascending list."""
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous == day - timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+
+async def rebuild_user_stats(db: AsyncSession, batch_size: int = 1000) -> int:
+    """Recompute every user_stats row from ended and archived practice sessions."""
+    ended = PracticeSession.ended_at.is_not(None)
+
+    rows: dict[str, dict] = {}
+
+    def row_for(user_id: str) -> dict:
+        if user_id not in rows:
+            rows[user_id] = {
+                "user_id": user_id,
+                **{name: 0 for m in PRACTICE_MODES for name in _counter_columns(m)},
+                "total_minutes": 0,
+                "feedback_positive": 0,
+                "feedback_total": 0,
+                "current_streak": 0,
+                "longest_streak": 0,
+                "last_practice_date": None,
+            }
+        return rows[user_id]
+
+    totals = await db.execute(
+        select(
+            PracticeSession.user_id,
+            PracticeSession.mode,
+            func.count(),
+            func.coalesce(func.sum(PracticeSession.duration_seconds), 0),
+            func.coalesce(func.sum(PracticeSession.metered_minutes), 0),
+            func.count(PracticeSession.feedback),
+            func.coalesce(func.sum(case((PracticeSession.feedback.is_(True), 1), else_=0)), 0),
+        )
+        .where(ended)
+        .group_by(PracticeSession.user_id, PracticeSession.mode)
+    )
+    for user_id, mode, count, seconds, minutes, feedback_total, feedback_positive in totals:
+        row = row_for(user_id)
+        sessions_column, seconds_column = _counter_columns(mode)
+        row[sessions_column] += count
+        row[seconds_column] += int(seconds)
+        row["total_minutes"] += int(minutes)
+        row["feedback_total"] += feedback_total
+        row["feedback_positive"] += int(feedback_positive)
+
+    # Archived sessions only survive as monthly totals; their days no
+    # longer count towards streaks
+    archived = await db.execute(
+        select(MonthlySummary).where(MonthlySummary.mode != ALL_MODES)
+    )
+    for summary in archived.scalars():
+        row = row_for(summary.user_id)
+        sessions_column, seconds_column = _counter_columns(summary.mode)
+        row[sessions_column] += summary.sessions
+        row[seconds_column] += summary.duration_seconds
+        row["total_minutes"] += summary.minutes
+        row["feedback_total"] += summary.feedback_total
+        row["feedback_positive"] += summary.feedback_positive
+
+    # Practice days are local billing days, which SQL cannot derive portably
+    ended_times = await db.stream(
+        select(PracticeSession.user_id, PracticeSession.ended_at)
+        .where(ended)
+        .order_by(PracticeSession.user_id, PracticeSession.ended_at)
+    )
+    user_days: dict[str, list[date]] = {}
+    async for user_id, ended_at in ended_times:
+        practice_days = user_days.setdefault(user_id, [])
+        day = billing_day(ended_at)
+        if not practice_days or practice_days[-1] != day:
+            practice_days.append(day)
+    for user_id, practice_days in user_days.items():
+        row = row_for(user_id)
+        row["current_streak"], row["longest_streak"] = _streaks(practice_days)
+        row["last_practice_date"] = practice_days[-1]
+
+    await db.execute(delete(UserStats))
+    values = list(rows.values())
+    for start in range(0, len(values), batch_size):
+        await db.execute(UserStats.__table__.insert(), values[start:start + batch_size])
+    return len(values)
+
+
+async def _main(command: str) -> int:
+    from app.database import async_session, engine, init_db
+
+    if command != "backfill":
+        print(f"Unknown command: {command}. Use backfill.")
+        return 2
+
+    try:
+        await init_db(force=True)
+        async with async_session() as db:
+            rebuilt = await rebuild_user_stats(db)
+            await db.commit()
+        print(f"Rebuilt user_stats for {rebuilt} users")
+        return 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "backfill")))
@@ -0,0 +1,130 @@
+from datetime import date, datetime, time, timezone
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import dialect_insert
+from app.models.usage import UsageRecord
+
+
+def billing_day(moment: Optional[datetime] = None) -> date:
+    """
+    The usage day a moment is billed to: the server's local date.
+
+    Timestamps are stored as naive UTC, but daily quotas reset at local
+    midnight, so every "which day" question (usage rows, entitlements,
+    stats, reports) is answered here rather than with ``.date()``.
+    """
+    if moment is None:
+        return date.today()
+    return moment.replace(tzinfo=timezone.utc).astimezone().date()
+
+
+def day_start(day: date) -> datetime:
+    """Naive UTC start of a local usage day, to compare with stored timestamps."""
+    return datetime.combine(day, time()).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def session_minutes(duration_seconds: int) -> int:
+    """Billable minutes for a finished session (at least one)."""
+    return max(1, duration_seconds // 60)
+
+
+async def record_usage(
+    db: AsyncSession,
+    user_id: str,
+    day: date,
+    minutes: int,
+    sessions: int = 1,
+):
+    """
+    Add minutes and sessions to a user's daily usage row.
+
+    A single INSERT ... ON CONFLICT DO UPDATE against the unique
+    (user_id, date) index, so concurrent writers never lose increments or
+    create duplicate rows. Returns the day's new (minutes_used,
+    sessions_count) totals.
+    """
+    insert = dialect_insert(db)
+    stmt = insert(UsageRecord).values(
+        user_id=user_id,
+        date=day,
+        minutes_used=minutes,
+        sessions_count=sessions,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UsageRecord.user_id, UsageRecord.date],
+        set_={
+            "minutes_used": UsageRecord.minutes_used + stmt.excluded.minutes_used,
+            "sessions_count": UsageRecord.sessions_count + stmt.excluded.sessions_count,
+            "updated_at": func.now(),
+        },
+    ).returning(UsageRecord.minutes_used, UsageRecord.sessions_count)
+
+    result = await db.execute(stmt)
+    return result.one()
+
+
+async def reserve_minutes(
+    db: AsyncSession,
+    user_id: str,
+    day: date,
+    minutes: int,
+    daily_limit: int,
+) -> Optional[int]:
+    """
+    Atomically add ``minutes`` to the day's usage if it stays within the limit.
+
+    The limit is checked in the upsert's conflict WHERE clause, so concurrent
+    reservations (other sessions, other workers) can never overshoot it.
+    Returns the new minutes_used total, or None when the minutes do not fit.
+    """
+    if minutes > daily_limit:
+        return None
+
+    insert = dialect_insert(db)
+    stmt = insert(UsageRecord).values(
+        user_id=user_id,
+        date=day,
+        minutes_used=minutes,
+        sessions_count=0,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UsageRecord.user_id, UsageRecord.date],
+        set_={
+            "minutes_used": UsageRecord.minutes_used + stmt.excluded.minutes_used,
+            "updated_at": func.now(),
+        },
+        where=UsageRecord.minutes_used + stmt.excluded.minutes_used <= daily_limit,
+    ).returning(UsageRecord.minutes_used)
+
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def reserve_up_to(
+    db: AsyncSession,
+    user_id: str,
+    day: date,
+    minutes: int,
+    daily_limit: int,
+) -> int:
+    """
+    Add as many of ``minutes`` to the day's usage as the limit allows.
+
+    Retries ``reserve_minutes`` with whatever is left of the allowance when
+    a concurrent reservation took part of it. Returns the minutes added.
+    """
+    while minutes > 0:
+        if await reserve_minutes(db, user_id, day, minutes, daily_limit) is not None:
+            return minutes
+        result = await db.execute(
+            select(UsageRecord.minutes_used).where(
+                UsageRecord.user_id == user_id,
+                UsageRecord.date == day,
+            )
+        )
+        used = result.scalar_one_or_none() or 0
+        minutes = min(minutes - 1, daily_limit - used)
+    return 0
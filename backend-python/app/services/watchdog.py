@@ -0,0 +1,112 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.metrics import Histogram
+
+# Seconds; a healthy loop sits in the first bucket or two
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop scheduling lag and reports what is blocking it.
+
+    A probe task sleeps for ``interval`` and records how late it woke up;
+    each wake-up also refreshes a heartbeat. A monitor thread watches that
+    heartbeat: when it goes stale by more than ``threshold`` the loop is
+    stuck in synchronous code, so the thread captures and logs the loop
+    thread's current stack while the stall is still in progress.
+    """
+
+    def __init__(self, interval: float, threshold: float, window: int = 600):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = Histogram(buckets=LAG_BUCKETS)
+        self.recent: deque[float] = deque(maxlen=window)
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None or self.interval <= 0:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._probe(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    async def _probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled)
+            self.lag.observe(lag)
+            self.recent.append(lag)
+            self._heartbeat = time.monotonic()
+
+    def _monitor(self) -> None:
+        reported = None
+        while not self._stopped.wait(self.interval / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.threshold or reported == heartbeat:
+                continue
+
+            # Log each stall once, with the stack that is holding the loop
+            reported = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            logger.warning(
+                f"Event loop blocked for {stalled_for * 1000:.0f}ms; loop thread stack:\n{stack}"
+            )
+
+    def percentile(self, q: float) -> float:
+        """Lag percentile over the recent window, in seconds."""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> dict:
+        return {
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(max(self.recent, default=0.0) * 1000, 3),
+            "samples": len(self.recent),
+            "stalls": self.stalls,
+        }
+
+
+loop_watchdog = LoopWatchdog(
+    interval=settings.loop_watchdog_interval_seconds,
+    threshold=settings.loop_lag_warn_seconds,
+)
@@ -0,0 +1,118 @@
+"""
+Cold-start profiling for the API process.
+
+    python -m app.startup profile            # import cost per module + init_db
+    python -m app.startup check [budget_ms]  # fail if startup exceeds the budget
+
+Imports are measured in a fresh interpreter with ``-X importtime`` so
+nothing already loaded here skews the numbers. ``check`` also fails when a
+module that should be imported lazily is loaded by ``import app.main``.
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+# Import + init_db budget for a warm-disk start on a small Railway instance
+DEFAULT_BUDGET_MS = 2000.0
+
+# Heavy dependencies only needed once auth or billing traffic arrives
+LAZY_MODULES = ("jose", "passlib", "bcrypt", "cryptography", "stripe")
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def profile_imports(target: str = "app.main") -> list[ImportTiming]:
+    """Import ``target`` in a fresh interpreter and parse -X importtime output."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings: dict[str, ImportTiming] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, module = (part.strip() for part in line[12:].split("|"))
+        if self_us.isdigit() and module not in timings:
+            timings[module] = ImportTiming(module, int(self_us), int(cumulative_us))
+    return list(timings.values())
+
+
+async def time_init_db() -> float:
+    """Seconds spent in init_db against the configured database."""
+    from app.database import engine, init_db
+
+    started = time.perf_counter()
+    try:
+        await init_db()
+    finally:
+        await engine.dispose()
+    return time.perf_counter() - started
+
+
+def _import_total_ms(timings: list[ImportTiming], target: str = "app.main") -> float:
+    return next((t.cumulative_us for t in timings if t.module == target), 0) / 1000
+
+
+def profile(top: int = 15) -> int:
+    timings = profile_imports()
+    print(f"import app.main: {_import_total_ms(timings):.1f}ms\n")
+
+    print(f"{'cumulative':>11} {'self':>9}  module (app)")
+    for t in sorted((t for t in timings if t.module.startswith("app")), key=lambda t: -t.cumulative_us)[:top]:
+        print(f"{t.cumulative_us / 1000:>9.1f}ms {t.self_us / 1000:>7.1f}ms  {t.module}")
+
+    print(f"\n{'cumulative':>11} {'self':>9}  module (third-party, top level)")
+    third_party = [t for t in timings if not t.module.startswith("app") and "." not in t.module]
+    for t in sorted(third_party, key=lambda t: -t.cumulative_us)[:top]:
+        print(f"{t.cumulative_us / 1000:>9.1f}ms {t.self_us / 1000:>7.1f}ms  {t.module}")
+
+    print(f"\ninit_db: {asyncio.run(time_init_db()) * 1000:.1f}ms")
+    return 0
+
+
+def check(budget_ms: float = DEFAULT_BUDGET_MS, attempts: int = 3) -> int:
+    # Best of a few runs, so a noisy neighbour does not fail the check
+    runs = [profile_imports() for _ in range(attempts)]
+    import_ms = min(_import_total_ms(timings) for timings in runs)
+    init_ms = asyncio.run(time_init_db()) * 1000
+    total_ms = import_ms + init_ms
+
+    failures = 0
+    loaded = {t.module.split(".")[0] for t in runs[0]}
+    for module in LAZY_MODULES:
+        if module in loaded:
+            print(f"FAIL {module} is imported at startup; import it where it is used")
+            failures += 1
+
+    verdict = "ok  " if total_ms <= budget_ms else "FAIL"
+    print(
+        f"{verdict} startup {total_ms:.1f}ms (imports {import_ms:.1f}ms + init_db {init_ms:.1f}ms) "
+        f"budget {budget_ms:.0f}ms"
+    )
+    failures += total_ms > budget_ms
+    return 1 if failures else 0
+
+
+def main(argv: list[str]) -> int:
+    command = argv[0] if argv else "profile"
+    if command == "profile":
+        return profile()
+    if command == "check":
+        return check(float(argv[1]) if len(argv) > 1 else DEFAULT_BUDGET_MS)
+
+    print(f"Unknown command: {command}. Use profile or check.")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,130 @@
+"""Prometheus exposition and deep health checks for the running process."""
+
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine, query_latency, query_totals
+from app.metrics import PrometheusWriter, request_metrics
+from app.services.analytics import event_buffer
+from app.services.cache import TTLCache
+from app.services.entitlements import entitlement_cache
+from app.services.hashing import password_hasher
+from app.services.metering import usage_meter
+from app.services.plans import plan_catalogue
+from app.services.principals import principal_cache
+from app.services.sessions import active_sessions, session_reaper
+from app.services.watchdog import loop_watchdog
+
+
+def _write_cache(out: PrometheusWriter, name: str, cache: TTLCache) -> None:
+    labels = {"cache": name}
+    out.counter("cache_hits_total", cache.hits, "Cache lookups served from memory", labels)
+    out.counter("cache_misses_total", cache.misses, "Cache lookups that fell through", labels)
+    out.gauge("cache_entries", len(cache), "Live entries per cache", labels)
+
+
+def render_metrics() -> str:
+    out = PrometheusWriter()
+
+    request_metrics.write(out)
+
+    out.counter("db_queries_total", query_totals.count, "Database queries issued")
+    out.counter("db_query_seconds_total", round(query_totals.seconds, 6), "Time spent in database queries")
+    out.histogram("db_query_duration_seconds", query_latency, "Database query latency")
+
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        out.gauge("db_pool_checked_out", pool.checkedout(), "Connections currently in use")
+        out.gauge("db_pool_size", pool.size(), "Configured pool size")
+
+    _write_cache(out, "principal_tokens", principal_cache.tokens)
+    _write_cache(out, "principal_users", principal_cache.users)
+    _write_cache(out, "entitlements", entitlement_cache)
+
+    out.gauge("password_hash_queue_depth", password_hasher.queue_depth, "Hashes waiting for a worker")
+    out.gauge("password_hash_in_flight", password_hasher.in_flight, "Hashes running on the pool")
+    out.histogram("password_hash_wait_seconds", password_hasher.wait_time, "Time queued before hashing")
+    out.histogram("password_hash_duration_seconds", password_hasher.latency, "bcrypt hash/verify time")
+
+    out.gauge("analytics_queue_depth", event_buffer.depth, "Analytics events waiting to be written")
+    for outcome in ("accepted", "dropped", "written", "failed"):
+        out.counter(
+            "analytics_events_total",
+            getattr(event_buffer, outcome),
+            "Analytics events by outcome",
+            {"outcome": outcome},
+        )
+
+    if active_sessions.authoritative:
+        out.gauge("practice_sessions_active", len(active_sessions), "Open practice sessions")
+    out.gauge("practice_sessions_metered", len(usage_meter), "Live sessions metered by this worker")
+    out.counter("practice_sessions_reaped_total", session_reaper.reaped, "Abandoned sessions auto-closed")
+
+    out.histogram("event_loop_lag_seconds", loop_watchdog.lag, "Event-loop scheduling lag")
+    out.counter("event_loop_stalls_total", loop_watchdog.stalls, "Stalls that logged a blocking stack")
+
+    out.counter("plan_catalogue_reloads_total", plan_catalogue.reloads, "Plan catalogue reloads")
+
+    return out.render()
+
+
+def pool_status() -> dict:
+    """Connection-pool usage, when the engine's pool reports it."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"class": type(pool).__name__}
+
+    # A negative max_overflow (DB_MAX_OVERFLOW=-1) means no limit: the pool
+    # never runs out, so report no capacity rather than pool_size.
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "capacity": capacity,
+        "exhausted": capacity is not None and pool.checkedout() >= capacity,
+    }
+
+
+async def _select_one() -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def _database_round_trip() -> dict:
+    started = time.perf_counter()
+    try:
+        # Bounds the pool checkout and connect as well: an exhausted pool or
+        # an unreachable server must fail the probe, not hang it
+        await asyncio.wait_for(_select_one(), timeout=settings.health_db_timeout_seconds)
+    except Exception as exc:
+        return {"ok": False, "error": type(exc).__name__}
+    return {"ok": True, "rtt_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+async def deep_health() -> tuple[bool, dict]:
+    """Loop lag, database round trip and pool usage; (healthy, report)."""
+    loop = loop_watchdog.stats()
+    database = await _database_round_trip()
+    pool = pool_status()
+
+    problems = []
+    if loop["p99_ms"] > settings.loop_lag_unhealthy_seconds * 1000:
+        problems.append("event_loop_lag")
+    if not database["ok"]:
+        problems.append("database")
+    if pool.get("exhausted"):
+        problems.append("pool_exhausted")
+
+    return not problems, {
+        "status": "degraded" if problems else "ok",
+        "problems": problems,
+        "event_loop": loop,
+        "database": database,
+        "pool": pool,
+    }
@@ -0,0 +1,303 @@
+"""
+In-process load test and latency benchmark for app.main:app.
+
+Drives the ASGI app through httpx's ASGI transport against a throwaway
+SQLite database, replaying a realistic traffic mix per virtual user:
+register/login, then loops of /subscriptions/check -> /sessions/start ->
+/sessions/{id}/end, /subscriptions/usage and analytics batches.
+
+Reports throughput and p50/p95/p99 latency per route, plus database
+queries per request as reported by the app's X-DB-Queries debug header.
+Results can be saved as a JSON baseline and later runs compared against
+it; the run exits non-zero when a route regresses beyond the threshold.
+
+    cd backend-python
+    python -m benchmarks.load --users 20 --iterations 15 --save benchmarks/baseline.json
+    python -m benchmarks.load --baseline benchmarks/baseline.json --threshold 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+PLAN_MIX = {"free": 0.55, "basic": 0.2, "standard": 0.15, "premium": 0.1}
+
+ANALYTICS_EVENTS = ["page_view", "scenario_start", "scenario_complete", "voice_selected"]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(q * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Collects latency, status and query counts per route label."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.queries: dict[str, list[int]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, client, route: str, method: str, url: str, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        self.latencies[route].append(elapsed)
+        # Reported by MetricsMiddleware when DEBUG_QUERY_HEADER is on
+        self.queries[route].append(int(response.headers.get("x-db-queries", 0)))
+        if response.status_code not in ok:
+            self.errors[route] += 1
+        return response
+
+    def report(self, wall_seconds: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            routes[route] = {
+                "count": len(samples),
+                "rps": round(len(samples) / wall_seconds, 2),
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+                "queries_per_request": round(sum(self.queries[route]) / len(samples), 3),
+                "errors": self.errors[route],
+            }
+
+        total = sum(r["count"] for r in routes.values())
+        return {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "wall_seconds": round(wall_seconds, 3),
+                "requests": total,
+                "rps": round(total / wall_seconds, 2),
+            },
+            "routes": routes,
+        }
+
+
+async def virtual_user(
+    index: int,
+    client,
+    recorder: Recorder,
+    iterations: int,
+    rng: random.Random,
+    register: bool = True,
+):
+    email = f"bench-{index}@example.com"
+    password = "bench-password"
+
+    if register:
+        await recorder.call(
+            client, "POST /api/auth/register", "POST", "/api/auth/register",
+            json={"email": email, "password": password, "name": f"Bench {index}"},
+        )
+    response = await recorder.call(
+        client, "POST /api/auth/login", "POST", "/api/auth/login",
+        json={"email": email, "password": password},
+    )
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    for _ in range(iterations):
+        await recorder.call(
+            client, "GET /api/auth/me", "GET", "/api/auth/me", headers=headers,
+        )
+
+        check = await recorder.call(
+            client, "GET /api/subscriptions/check", "GET", "/api/subscriptions/check",
+            headers=headers,
+        )
+        if check.json().get("allowed"):
+            start = await recorder.call(
+                client, "POST /api/sessions/start", "POST", "/api/sessions/start",
+                ok=(200, 403), headers=headers,
+                json={"mode": rng.choice(["everyday", "slang", "workplace"])},
+            )
+            if start.status_code == 200:
+                await recorder.call(
+                    client, "GET /api/sessions/active", "GET", "/api/sessions/active",
+                    headers=headers,
+                )
+                await recorder.call(
+                    client, "POST /api/sessions/{session_id}/end", "POST",
+                    f"/api/sessions/{start.json()['id']}/end",
+                    headers=headers,
+                    json={"messages_count": rng.randint(1, 30), "feedback": rng.random() < 0.7},
+                )
+
+        await recorder.call(
+            client, "GET /api/subscriptions/usage", "GET", "/api/subscriptions/usage",
+            headers=headers,
+        )
+
+        if rng.random() < 0.8:
+            now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            await recorder.call(
+                client, "POST /api/analytics/events", "POST", "/api/analytics/events",
+                json={
+                    "sessionId": f"bench-{index}",
+                    "events": [
+                        {"name": rng.choice(ANALYTICS_EVENTS), "properties": {"i": i}, "timestamp": now}
+                        for i in range(rng.randint(1, 20))
+                    ],
+                },
+            )
+
+        if rng.random() < 0.2:
+            await recorder.call(
+                client, "GET /api/sessions/history", "GET", "/api/sessions/history",
+                headers=headers,
+            )
+
+
+async def assign_plans(users: int, rng: random.Random) -> None:
+    """Spread benchmark users over plans so limit checks take both branches."""
+    from sqlalchemy import select, update
+
+    from app.database import async_session
+    from app.models.subscription import Subscription
+    from app.models.user import User
+    from app.services.entitlements import entitlement_cache
+
+    plans, weights = zip(*PLAN_MIX.items())
+    async with async_session() as session:
+        for index in range(users):
+            plan = rng.choices(plans, weights)[0]
+            user_id = select(User.id).where(User.email == f"bench-{index}@example.com")
+            await session.execute(
+                update(Subscription)
+                .where(Subscription.user_id == user_id.scalar_subquery())
+                .values(plan=plan)
+            )
+        await session.commit()
+    entitlement_cache.clear()
+
+
+async def run(users: int, signups: int, iterations: int, seed: int) -> dict:
+    import httpx
+
+    from app.main import app
+
+    rng = random.Random(seed)
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Returning users sign up untimed so they can be spread over plans;
+            # the timed run has them log in, alongside a batch of new signups.
+            await asyncio.gather(*(
+                virtual_user(i, client, Recorder(), 0, random.Random(seed + i))
+                for i in range(users)
+            ))
+            await assign_plans(users, rng)
+
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    virtual_user(i, client, recorder, iterations, random.Random(seed + i), register=False)
+                    for i in range(users)
+                ),
+                *(
+                    virtual_user(i, client, recorder, iterations, random.Random(seed + i))
+                    for i in range(users, users + signups)
+                ),
+            )
+            wall = time.perf_counter() - started
+
+    return recorder.report(wall)
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list[str]:
+    """Return a description of every route that regressed against the baseline."""
+    regressions = []
+    for route, base in baseline["routes"].items():
+        now = current["routes"].get(route)
+        if now is None:
+            continue
+
+        for key in ("p95_ms", "p99_ms"):
+            limit = base[key] * (1 + threshold)
+            if now[key] > limit and now[key] - base[key] > min_delta_ms:
+                regressions.append(
+                    f"{route}: {key} {now[key]:.2f}ms > {base[key]:.2f}ms +{threshold:.0%}"
+                )
+
+        if now["queries_per_request"] > base["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{route}: queries/request {now['queries_per_request']} "
+                f"> {base['queries_per_request']}"
+            )
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    meta = report["meta"]
+    print(
+        f"\n{meta['requests']} requests in {meta['wall_seconds']}s "
+        f"({meta['rps']} req/s, Python {meta['python']})\n"
+    )
+    print(f"{'route':<40} {'count':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6} {'err':>4}")
+    for route, r in report["routes"].items():
+        print(
+            f"{route:<40} {r['count']:>6} {r['rps']:>8} {r['p50_ms']:>8.2f} "
+            f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['queries_per_request']:>6} {r['errors']:>4}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="returning virtual users")
+    parser.add_argument("--signups", type=int, default=5, help="new users registering during the run")
+    parser.add_argument("--iterations", type=int, default=15, help="loops per virtual user")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", type=Path, help="write results as a JSON baseline")
+    parser.add_argument("--baseline", type=Path, help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p95/p99 slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore smaller slowdowns")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so point the app at a scratch
+    # database before anything from app/ is imported.
+    workdir = tempfile.mkdtemp(prefix="speakaussie-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir}/bench.db"
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+    os.environ["DEBUG_QUERY_HEADER"] = "true"
+
+    report = asyncio.run(run(args.users, args.signups, args.iterations, args.seed))
+    print_report(report)
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaseline written to {args.save}")
+
+    if args.baseline:
+        regressions = compare(
+            report, json.loads(args.baseline.read_text()), args.threshold, args.min_delta_ms
+        )
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+
+    errors = sum(r["errors"] for r in report["routes"].values())
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Bulk synthetic data generator for benchmark databases.
+
+Generates users with subscriptions, daily usage and practice sessions,
+deterministically from ``--seed``: the same arguments always produce the
+same rows. Rows go in through batched Core ``insert()`` executemany (one
+transaction per batch) and every user shares one bcrypt hash computed up
+front, so a million users take minutes rather than hours. Works against
+whatever DATABASE_URL points at, SQLite or Postgres.
+
+    cd backend-python
+    DATABASE_URL=sqlite+aiosqlite:///./data/bench.db python -m benchmarks.seed --users 100000
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.seed --users 1000000 --days 180
+
+Seeded users log in as ``seed-<n>@example.com`` with ``--password``.
+Target an empty database: emails and ids collide with an earlier run
+using the same seed. Derived tables are not written; afterwards run
+
+    python -m app.services.stats backfill
+    python -m app.services.reporting compact <days>
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from benchmarks.load import PLAN_MIX
+
+MODE_MIX = {"everyday": 0.5, "slang": 0.3, "workplace": 0.2}
+STATUS_MIX = {"active": 0.92, "past_due": 0.03, "cancelled": 0.05}
+
+# Insert order respects the foreign keys to users
+TABLES = ("users", "subscriptions", "usage_records", "practice_sessions")
+
+
+class Generator:
+    """Yields rows per table for one user at a time, from a seeded RNG."""
+
+    def __init__(self, seed: int, days: int, end_date: date, password_hash: str):
+        from app.models.subscription import PLAN_LIMITS
+
+        self.rng = random.Random(seed)
+        self.days = days
+        self.end_date = end_date
+        self.password_hash = password_hash
+        self.daily_limits = {plan: limits["daily_minutes"] for plan, limits in PLAN_LIMITS.items()}
+
+    def _id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _pick(self, mix: dict[str, float]) -> str:
+        return self.rng.choices(list(mix), weights=list(mix.values()))[0]
+
+    def _at(self, day: date) -> datetime:
+        return datetime.combine(day, datetime.min.time()) + timedelta(seconds=self.rng.randrange(86400))
+
+    def user(self, index: int) -> dict[str, list[dict]]:
+        rng = self.rng
+        rows: dict[str, list[dict]] = defaultdict(list)
+
+        user_id = self._id()
+        # Signups spread over the window, weighted towards its start
+        joined = self.end_date - timedelta(days=int(self.days * (1 - rng.random() ** 2)))
+        created_at = self._at(joined)
+        rows["users"].append({
+            "id": user_id,
+            "email": f"seed-{index}@example.com",
+            "password_hash": self.password_hash,
+            "name": f"Seed User {index}",
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+
+        plan = self._pick(PLAN_MIX)
+        paid = plan != "free"
+        period_start = self._at(max(joined, self.end_date - timedelta(days=rng.randrange(30))))
+        rows["subscriptions"].append({
+            "id": self._id(),
+            "user_id": user_id,
+            "plan": plan,
+            "stripe_customer_id": f"cus_seed{index}" if paid else None,
+            "stripe_subscription_id": f"sub_seed{index}" if paid else None,
+            "status": self._pick(STATUS_MIX) if paid else "active",
+            "current_period_start": period_start if paid else None,
+            "current_period_end": period_start + timedelta(days=30) if paid else None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+
+        # Engagement is heavy-tailed: most users practise rarely, a few daily
+        engagement = rng.betavariate(0.6, 2.5) * (1.5 if paid else 1.0)
+        daily_seconds = self.daily_limits[plan] * 60
+        day = joined
+        while day <= self.end_date:
+            if rng.random() < engagement:
+                minutes_used = 0
+                sessions = rng.choices((1, 2, 3), weights=(0.7, 0.2, 0.1))[0]
+                for _ in range(sessions):
+                    started_at = self._at(day)
+                    duration = rng.randint(20, max(20, daily_seconds // sessions))
+                    minutes = max(1, duration // 60)
+                    minutes_used += minutes
+                    given = rng.random() < 0.6
+                    rows["practice_sessions"].append({
+                        "id": self._id(),
+                        "user_id": user_id,
+                        "mode": self._pick(MODE_MIX),
+                        "started_at": started_at,
+                        "ended_at": started_at + timedelta(seconds=duration),
+                        "last_active_at": started_at + timedelta(seconds=duration),
+                        "metered_minutes": minutes,
+                        "duration_seconds": duration,
+                        "messages_count": rng.randint(1, max(1, duration // 15)),
+                        "feedback": (rng.random() < 0.75) if given else None,
+                        "created_at": started_at,
+                    })
+                rows["usage_records"].append({
+                    "id": self._id(),
+                    "user_id": user_id,
+                    "date": day,
+                    "minutes_used": minutes_used,
+                    "sessions_count": sessions,
+                    "created_at": self._at(day),
+                    "updated_at": self._at(day),
+                })
+            day += timedelta(days=1)
+
+        return rows
+
+
+def _hash_password(password: str) -> str:
+    """One bcrypt hash, shared by every seeded user."""
+    from app.services.auth import password_context
+
+    return password_context().hash(password)
+
+
+async def seed(users: int, days: int, seed_value: int, batch_size: int, password: str, end_date: date) -> dict:
+    from app.database import engine, init_db
+    from app.models import PracticeSession, Subscription, UsageRecord, User
+
+    tables = {
+        "users": User.__table__,
+        "subscriptions": Subscription.__table__,
+        "usage_records": UsageRecord.__table__,
+        "practice_sessions": PracticeSession.__table__,
+    }
+    await init_db(force=True)
+
+    generator = Generator(seed_value, days, end_date, _hash_password(password))
+    pending: dict[str, list[dict]] = defaultdict(list)
+    inserted = dict.fromkeys(TABLES, 0)
+    insert_seconds = 0.0
+
+    async def flush() -> None:
+        nonlocal insert_seconds
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            for name in TABLES:
+                if pending[name]:
+                    await conn.execute(tables[name].insert(), pending[name])
+                    inserted[name] += len(pending[name])
+        insert_seconds += time.perf_counter() - started
+        pending.clear()
+
+    started = time.perf_counter()
+    for index in range(users):
+        for name, rows in generator.user(index).items():
+            pending[name].extend(rows)
+        if max(len(rows) for rows in pending.values()) >= batch_size:
+            await flush()
+            print(f"\r{index + 1}/{users} users", end="", file=sys.stderr, flush=True)
+    await flush()
+    print(file=sys.stderr)
+    wall = time.perf_counter() - started
+
+    await engine.dispose()
+    total = sum(inserted.values())
+    return {
+        "rows": inserted,
+        "total_rows": total,
+        "wall_seconds": round(wall, 2),
+        "insert_seconds": round(insert_seconds, 2),
+        "rows_per_second": round(total / wall) if wall else 0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=90, help="length of the usage history")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per table per transaction")
+    parser.add_argument("--password", default="bench-password", help="login password of every seeded user")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(),
+                        help="last day of history (fix it for byte-identical datasets across days)")
+    args = parser.parse_args()
+
+    report = asyncio.run(seed(args.users, args.days, args.seed, args.batch_size, args.password, args.end_date))
+
+    for name in TABLES:
+        print(f"{name:<20} {report['rows'][name]:>12,}")
+    print(
+        f"{'total':<20} {report['total_rows']:>12,} rows in {report['wall_seconds']}s "
+        f"({report['rows_per_second']:,} rows/s; {report['insert_seconds']}s inserting)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
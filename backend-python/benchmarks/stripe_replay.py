@@ -0,0 +1,254 @@
+"""
+Local Stripe stand-in: replays signed webhook events against the app.
+
+Generates a subscription lifecycle per user (checkout, subscription
+created/updated with plan changes, failed and paid invoices, some
+cancellations), then delivers the events the way Stripe does at its
+worst: concurrently, partly out of order and with redeliveries. Every
+request is signed with the configured webhook secret and sent in-process
+through httpx's ASGI transport against a throwaway SQLite database.
+
+Reports acknowledgement throughput and latency, how long the background
+worker takes to apply everything, and whether each user's subscription
+ended in the state its newest event describes. Exits non-zero on any
+mismatch or rejected delivery.
+
+    cd backend-python
+    python -m benchmarks.stripe_replay --users 500 --concurrency 50
+    python -m benchmarks.stripe_replay --dump benchmarks/stripe_events.jsonl
+    python -m benchmarks.stripe_replay --fixtures benchmarks/stripe_events.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from benchmarks.load import percentile
+
+PRICES = {"basic": "price_bench_basic", "standard": "price_bench_standard", "premium": "price_bench_premium"}
+WEBHOOK_SECRET = "whsec_bench"
+
+
+def lifecycle(rng: random.Random, user_id: str, index: int, start: int) -> list[dict]:
+    """One user's events, in the order Stripe creates them."""
+    customer, subscription = f"cus_bench{index}", f"sub_bench{index}"
+    created = start + rng.randrange(3600)
+    events = []
+
+    def event(event_type: str, obj: dict) -> None:
+        nonlocal created
+        created += rng.randint(1, 600)
+        events.append({
+            "id": f"evt_{uuid.UUID(int=rng.getrandbits(128)).hex[:24]}",
+            "object": "event",
+            "type": event_type,
+            "created": created,
+            "data": {"object": obj},
+        })
+
+    def subscription_object(plan: str, status: str) -> dict:
+        return {
+            "id": subscription,
+            "object": "subscription",
+            "customer": customer,
+            "status": status,
+            "metadata": {"userId": user_id},
+            "current_period_start": created,
+            "current_period_end": created + 30 * 86400,
+            "items": {"data": [{"price": {"id": PRICES[plan]}}]},
+        }
+
+    plan = rng.choice(list(PRICES))
+    event("customer.subscription.created", subscription_object(plan, "incomplete"))
+    event("checkout.session.completed", {
+        "object": "checkout.session",
+        "customer": customer,
+        "subscription": subscription,
+        "client_reference_id": user_id,
+        "metadata": {"userId": user_id, "plan": plan},
+    })
+    event("customer.subscription.updated", subscription_object(plan, "active"))
+    event("invoice.paid", {"object": "invoice", "customer": customer, "subscription": subscription})
+
+    for _ in range(rng.randint(0, 3)):
+        roll = rng.random()
+        if roll < 0.5:
+            plan = rng.choice(list(PRICES))
+            event("customer.subscription.updated", subscription_object(plan, "active"))
+        elif roll < 0.8:
+            event("invoice.payment_failed", {"object": "invoice", "customer": customer, "subscription": subscription})
+            event("customer.subscription.updated", subscription_object(plan, "past_due"))
+        else:
+            event("invoice.paid", {"object": "invoice", "customer": customer, "subscription": subscription})
+            event("customer.subscription.updated", subscription_object(plan, "active"))
+
+    if rng.random() < 0.15:
+        event("customer.subscription.deleted", subscription_object(plan, "canceled"))
+    return events
+
+
+def expected_state(events: list[dict]) -> tuple:
+    """(plan, status, stripe_subscription_id) per the newest subscription event."""
+    snapshots = [e for e in events if e["type"].startswith("customer.subscription.")]
+    last = max(snapshots, key=lambda e: e["created"])
+    obj = last["data"]["object"]
+    if last["type"] == "customer.subscription.deleted":
+        return "free", "active", None
+    plan = {v: k for k, v in PRICES.items()}[obj["items"]["data"][0]["price"]["id"]]
+    status = {"active": "active", "past_due": "past_due"}[obj["status"]]
+    return plan, status, obj["id"]
+
+
+async def create_users(count: int) -> list[str]:
+    """Users with a free subscription each, inserted directly (no bcrypt)."""
+    from app.database import engine
+    from app.models import Subscription, User
+
+    user_ids = [str(uuid.UUID(int=i + 1)) for i in range(count)]
+    async with engine.begin() as conn:
+        await conn.execute(User.__table__.insert(), [
+            {"id": uid, "email": f"stripe-{i}@example.com", "password_hash": "-"}
+            for i, uid in enumerate(user_ids)
+        ])
+        await conn.execute(Subscription.__table__.insert(), [
+            {"id": str(uuid.uuid4()), "user_id": uid, "plan": "free", "status": "active"}
+            for uid in user_ids
+        ])
+    return user_ids
+
+
+def delivery_order(rng: random.Random, events: list[dict], jitter: int, duplicates: float) -> list[dict]:
+    """Creation order perturbed by up to ``jitter`` places, plus redeliveries."""
+    ordered = sorted(events, key=lambda e: e["created"])
+    keyed = [(i + rng.uniform(0, jitter), e) for i, e in enumerate(ordered)]
+    keyed += [(i + rng.uniform(0, jitter * 4), e) for i, e in enumerate(ordered) if rng.random() < duplicates]
+    return [e for _, e in sorted(keyed, key=lambda pair: pair[0])]
+
+
+async def run(args) -> dict:
+    import httpx
+    from sqlalchemy import func, select
+
+    from app.database import async_session
+    from app.main import app
+    from app.models import StripeEvent, Subscription
+    from app.services.billing import sign_payload, stripe_event_worker
+
+    rng = random.Random(args.seed)
+    async with app.router.lifespan_context(app):
+        expected = {}
+        if args.fixtures:
+            events = [json.loads(line) for line in args.fixtures.read_text().splitlines() if line.strip()]
+        else:
+            user_ids = await create_users(args.users)
+            start = int(time.time()) - 86400
+            events = []
+            for index, user_id in enumerate(user_ids):
+                timeline = lifecycle(rng, user_id, index, start)
+                expected[user_id] = expected_state(timeline)
+                events.extend(timeline)
+            if args.dump:
+                args.dump.write_text("".join(json.dumps(e) + "\n" for e in events))
+                print(f"Wrote {len(events)} events to {args.dump}")
+
+        deliveries = delivery_order(rng, events, args.jitter, args.duplicates)
+        latencies, rejected = [], 0
+        queue = iter(deliveries)
+
+        async def sender(client) -> None:
+            nonlocal rejected
+            for event in queue:
+                payload = json.dumps(event).encode()
+                headers = {"Stripe-Signature": sign_payload(payload, WEBHOOK_SECRET), "Content-Type": "application/json"}
+                started = time.perf_counter()
+                response = await client.post("/api/billing/webhook", content=payload, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                rejected += response.status_code != 200
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stripe") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(sender(client) for _ in range(args.concurrency)))
+            ack_wall = time.perf_counter() - started
+
+            # Wait for the worker to apply everything it was handed
+            while True:
+                async with async_session() as db:
+                    pending = (await db.execute(
+                        select(func.count()).select_from(StripeEvent).where(StripeEvent.processed_at.is_(None))
+                    )).scalar_one()
+                if pending == 0:
+                    break
+                await asyncio.sleep(0.05)
+            applied_wall = time.perf_counter() - started
+
+        async with async_session() as db:
+            stored = (await db.execute(select(func.count()).select_from(StripeEvent))).scalar_one()
+            failed = (await db.execute(
+                select(func.count()).select_from(StripeEvent).where(StripeEvent.error.is_not(None))
+            )).scalar_one()
+            rows = await db.execute(select(
+                Subscription.user_id, Subscription.plan, Subscription.status, Subscription.stripe_subscription_id
+            ))
+            mismatches = [
+                (user_id, (plan, status, sub_id), expected[user_id])
+                for user_id, plan, status, sub_id in rows
+                if user_id in expected and (plan, status, sub_id) != expected[user_id]
+            ]
+
+    latencies.sort()
+    return {
+        "events": len(events),
+        "deliveries": len(deliveries),
+        "stored": stored,
+        "rejected": rejected,
+        "retried_or_failed": failed,
+        "worker_processed": stripe_event_worker.processed,
+        "ack_per_second": round(len(deliveries) / ack_wall),
+        "ack_p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "ack_p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "applied_seconds": round(applied_wall, 2),
+        "checked_users": len(expected),
+        "mismatches": mismatches,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20, help="parallel deliveries")
+    parser.add_argument("--jitter", type=int, default=20, help="max places an event is delivered out of order")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of events delivered twice")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fixtures", type=Path, help="replay events from a JSONL file instead of generating them")
+    parser.add_argument("--dump", type=Path, help="write the generated events as JSONL fixtures")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the app before
+    # anything from app/ is imported.
+    workdir = tempfile.mkdtemp(prefix="speakaussie-stripe-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir}/stripe.db"
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+    os.environ["STRIPE_WEBHOOK_SECRET"] = WEBHOOK_SECRET
+    for plan, price in PRICES.items():
+        os.environ[f"STRIPE_PRICE_{plan.upper()}"] = price
+
+    report = asyncio.run(run(args))
+    for key, value in report.items():
+        if key != "mismatches":
+            print(f"{key:<20} {value}")
+    for user_id, got, want in report["mismatches"][:10]:
+        print(f"mismatch {user_id}: got {got}, expected {want}")
+    print(f"{'mismatches':<20} {len(report['mismatches'])}")
+    return 1 if report["mismatches"] or report["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())